@@ -0,0 +1,117 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+
+API_PREFIX = '/api/'
+BATCH_PATH = '/api/batch/'
+
+
+def unbatchable(view):
+    """Marks a view or viewset action that streams its response, so it is not batched."""
+    view.batchable = False
+    return view
+
+
+def is_batchable(match, method):
+    """Whether the resolved view returns a plain response that a batch can run in-process."""
+    view = match.func
+    if iscoroutinefunction(view) or not getattr(view, 'batchable', True):
+        return False
+    actions = getattr(view, 'actions', None)
+    if actions and method.lower() in actions:
+        handler = getattr(view.cls, actions[method.lower()], None)
+        return getattr(handler, 'batchable', True)
+    return True
+
+
+def build_request(parent, user, token, method, url, body=None):
+    """Builds a sub-request that reuses the authentication of the batch request."""
+    split = urlsplit(url)
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': split.path,
+        'QUERY_STRING': split.query,
+        'SERVER_NAME': parent.get_host().rsplit(':', 1)[0],
+        'SERVER_PORT': parent.get_port(),
+        'HTTP_HOST': parent.get_host(),
+        'REMOTE_ADDR': parent.META.get('REMOTE_ADDR', ''),
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.url_scheme': parent.scheme,
+        'wsgi.input': io.BytesIO(payload),
+    }
+    request = WSGIRequest(environ)
+    # Picked up by rest_framework.request.Request instead of authenticating again
+    request._force_auth_user = user
+    request._force_auth_token = token
+    request.user = user
+    return request
+
+
+def dispatch(parent, user, token, item):
+    """Runs one sub-request through the API view it resolves to."""
+    path = urlsplit(item['url']).path
+    if not path.startswith(API_PREFIX) or path == BATCH_PATH:
+        return {'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'detail': 'Only API routes can be batched.'}}
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+    if not is_batchable(match, item['method']):
+        return {'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'detail': 'Async and streaming routes cannot be batched.'}}
+    request = build_request(parent, user, token, item['method'], item['url'], item.get('body'))
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        if response.streaming:
+            # Not consumed, so the streamed work never runs
+            response.close()
+            return {'status': status.HTTP_400_BAD_REQUEST,
+                    'body': {'detail': 'Async and streaming routes cannot be batched.'}}
+        if hasattr(response, 'data'):
+            body = response.data
+        else:
+            body = response.content.decode(response.charset or 'utf-8')
+    except Exception as error:
+        return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'error': str(error)}}
+    return {'status': response.status_code, 'body': body}
+
+
+def _dispatch_in_thread(parent, user, token, item):
+    try:
+        return dispatch(parent, user, token, item)
+    finally:
+        connections.close_all()
+
+
+def run_batch(parent, user, token, items, parallel=False):
+    """
+    Runs the sub-requests in order. With `parallel`, every run of
+    consecutive GET requests is executed concurrently, other methods act
+    as barriers so reads never overtake a preceding write.
+    """
+    if not parallel:
+        return [dispatch(parent, user, token, item) for item in items]
+    results = []
+    with ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS) as executor:
+        reads = []
+        for item in items + [None]:
+            if item is not None and item['method'] in permissions.SAFE_METHODS:
+                reads.append(item)
+                continue
+            results.extend(executor.map(
+                lambda read: _dispatch_in_thread(parent, user, token, read), reads))
+            reads = []
+            if item is not None:
+                results.append(dispatch(parent, user, token, item))
+    return results
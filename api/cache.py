@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+MISSING = object()
+
+DEFAULTS = {
+    'ALIAS': 'shared',
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 30,
+    'VERSION_TTL': 1,
+    'DEFAULT_TTL': 300,
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 2,
+    'LOCK_POLL_INTERVAL': 0.05,
+}
+LOCK_STRIPES = 64
+
+
+class LocalLRU:
+    """Bounded in-process LRU cache with per-key expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value or MISSING if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """Stores the value, evicting the least recently used entries."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache:
+    """
+    In-process LRU in front of the shared cache backend.
+
+    Reads check the local LRU first and the shared backend second. Local
+    entries live for at most LOCAL_TTL seconds, so other processes see
+    writes and invalidations with bounded staleness. Namespaces carry a
+    version token, bumping it invalidates every key built with key().
+    """
+
+    def __init__(self, options=None):
+        options = {**DEFAULTS, **(options or {})}
+        self.alias = options['ALIAS']
+        self.local_ttl = options['LOCAL_TTL']
+        self.version_ttl = options['VERSION_TTL']
+        self.default_ttl = options['DEFAULT_TTL']
+        self.lock_timeout = options['LOCK_TIMEOUT']
+        self.lock_wait = options['LOCK_WAIT']
+        self.lock_poll_interval = options['LOCK_POLL_INTERVAL']
+        self.local = LocalLRU(options['LOCAL_MAX_ENTRIES'])
+        self._flight_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._stats_lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Returns hit/miss counters for this process."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = sum(stats.values())
+        stats['hit_ratio'] = ((stats['local_hits'] + stats['shared_hits']) / lookups
+                              if lookups else 0.0)
+        return stats
+
+    def _local_ttl(self, ttl):
+        return min(ttl, self.local_ttl) if ttl else self.local_ttl
+
+    def _lookup(self, key, ttl=None):
+        value = self.local.get(key)
+        if value is not MISSING:
+            self._count('local_hits')
+            return value
+        value = self.shared.get(key, MISSING)
+        if value is not MISSING:
+            self._count('shared_hits')
+            self.local.set(key, value, self._local_ttl(ttl))
+        return value
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        if value is MISSING:
+            self._count('misses')
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.default_ttl
+        self.shared.set(key, value, ttl)
+        self.local.set(key, value, self._local_ttl(ttl))
+
+    def delete(self, key):
+        self.shared.delete(key)
+        self.local.delete(key)
+
+    @contextmanager
+    def lock(self, key, backend=None):
+        """
+        Best-effort cross-process lock on the backend's add(), waits up to
+        LOCK_WAIT seconds and yields whether the lock was acquired. add() is
+        only atomic on backends like memcached, redis or the database cache;
+        on the file-based cache it is a check followed by a write, so callers
+        must not rely on this for correctness.
+        """
+        backend = backend or self.shared
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + self.lock_wait
+        acquired = backend.add(lock_key, 1, self.lock_timeout)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(self.lock_poll_interval)
+            acquired = backend.add(lock_key, 1, self.lock_timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                backend.delete(lock_key)
+
+    def get_or_set(self, key, producer, ttl=None):
+        """
+        Returns the cached value, computing it with producer() on a miss.
+
+        Concurrent misses are collapsed: one thread per process computes
+        the value while holding a striped lock, and one process holds the
+        shared lock while the others poll the shared backend for the
+        result for up to LOCK_WAIT seconds before computing it themselves.
+        """
+        value = self._lookup(key, ttl)
+        if value is not MISSING:
+            return value
+        with self._flight_locks[hash(key) % LOCK_STRIPES]:
+            value = self._lookup(key, ttl)
+            if value is not MISSING:
+                return value
+            self._count('misses')
+            lock_key = f'{key}:lock'
+            if not self.shared.add(lock_key, 1, self.lock_timeout):
+                deadline = time.monotonic() + self.lock_wait
+                while time.monotonic() < deadline:
+                    time.sleep(self.lock_poll_interval)
+                    value = self.shared.get(key, MISSING)
+                    if value is not MISSING:
+                        self.local.set(key, value, self._local_ttl(ttl))
+                        return value
+                lock_key = None
+            try:
+                value = producer()
+                self.set(key, value, ttl)
+            finally:
+                if lock_key:
+                    self.shared.delete(lock_key)
+            return value
+
+    def version(self, namespace):
+        """Returns the current version token of a namespace."""
+        version_key = f'{namespace}:version'
+        version = self.local.get(version_key)
+        if version is MISSING:
+            version = self.shared.get(version_key)
+            if version is None:
+                version = time.time_ns()
+                if not self.shared.add(version_key, version, None):
+                    version = self.shared.get(version_key, version)
+            self.local.set(version_key, version, self.version_ttl)
+        return version
+
+    def bump(self, namespace):
+        """Invalidates every key of a namespace."""
+        version_key = f'{namespace}:version'
+        version = time.time_ns()
+        self.shared.set(version_key, version, None)
+        self.local.set(version_key, version, self.version_ttl)
+
+    def key(self, namespace, *parts):
+        """Builds a key bound to the current version of a namespace."""
+        return ':'.join([namespace, str(self.version(namespace)), *map(str, parts)])
+
+
+api_cache = TwoTierCache(getattr(settings, 'API_CACHE', None))
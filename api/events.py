@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+from django.conf import settings
+
+
+def _put_dropping_oldest(queue, event):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class Broker:
+    """
+    In-process publish/subscribe of quiz events.
+
+    Subscribers are asyncio queues bound to the event loop of the ASGI
+    request that created them. Publishing is thread-safe and never blocks:
+    a slow subscriber loses its oldest events instead of growing its queue.
+    """
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, quiz_id):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(quiz_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, quiz_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(quiz_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(quiz_id, None)
+
+    def publish(self, quiz_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(quiz_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_dropping_oldest, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop is already closed
+                self.unsubscribe(quiz_id, (loop, queue))
+
+
+broker = Broker(settings.EVENTS_QUEUE_SIZE)
@@ -0,0 +1,133 @@
+"""
+Read-only fast paths for the largest list endpoints.
+
+They fetch exactly the columns the serializers in api/serializers.py read
+with values_list() and build the same dicts directly, which skips model
+instantiation and per-field serializer calls. The output must stay
+identical to the serializers, `python manage.py benchmark_serializers`
+checks that and measures both.
+"""
+from rest_framework import serializers
+
+from api.serializers import QuizSessionSerializer
+from quiz.models import Answer
+from session.models import QuizSession, Response
+from session.packing import unpack_ids
+
+# Renders datetimes exactly like the DateTimeFields of the serializers
+DATETIME = serializers.DateTimeField()
+
+ANSWER_COLUMNS = ('id', 'question_id', 'answer_text', 'is_correct')
+QUESTION_COLUMNS = ('id', 'quiz_id', 'quiz__title', 'prompt')
+SESSION_COLUMNS = ('id', 'user_id', 'user__username', 'quiz_id', 'quiz__title', 'started_at',
+                   'completed_at', 'score', 'is_completed', 'question_vector', 'answer_vector',
+                   'result')
+RESPONSE_COLUMNS = ('id', 'session_id', 'question_id', 'question__prompt',
+                    'selected_answer_id', 'selected_answer__answer_text')
+
+
+def _answer(answer_id, question_id, answer_text, is_correct):
+    return {'id': answer_id, 'question': question_id, 'answer_text': answer_text,
+            'is_correct': is_correct}
+
+
+def answer_rows(queryset):
+    """Same output as AnswerSerializer(queryset, many=True).data."""
+    return [_answer(*row) for row in queryset.values_list(*ANSWER_COLUMNS)]
+
+
+def question_rows(queryset):
+    """
+    Same output as QuestionSerializer(queryset, many=True).data, with the
+    answers of all questions loaded by one query instead of one per question.
+    """
+    questions = list(queryset.values_list(*QUESTION_COLUMNS))
+    answers = {question_id: [] for question_id, _, _, _ in questions}
+    # Answers have no default ordering, per question they come back by id
+    for row in (Answer.objects.filter(question_id__in=answers)
+                .order_by('question_id', 'id').values_list(*ANSWER_COLUMNS)):
+        answers[row[1]].append(_answer(*row))
+    return [{'id': question_id, 'quiz': quiz_id, 'quiz_title': quiz_title, 'prompt': prompt,
+             'answers': answers[question_id]}
+            for question_id, quiz_id, quiz_title, prompt in questions]
+
+
+class SessionRow:
+    """Columns of one session as fetched for the list."""
+    __slots__ = SESSION_COLUMNS
+
+    def __init__(self, values):
+        for name, value in zip(SESSION_COLUMNS, values):
+            setattr(self, name, value)
+
+    @property
+    def is_simple(self):
+        """
+        Whether the row can be rendered without the serializer: completed
+        sessions need a stored result document, in-progress ones their
+        Response rows.
+        """
+        if self.is_completed:
+            return self.result is not None
+        return self.answer_vector is None
+
+
+def session_values(queryset):
+    """Returns the session columns session_rows() renders, ready to be paginated."""
+    return queryset.values_list(*SESSION_COLUMNS)
+
+
+def session_rows(values):
+    """
+    Same output as QuizSessionSerializer(queryset, many=True).data for the
+    session_values() of the queryset.
+
+    Completed sessions come from their result documents and in-progress
+    ones from one query over all their responses. The rare rows that need
+    model logic, like completed sessions whose document was dropped by a
+    regrade, still go through the serializer.
+    """
+    rows = [SessionRow(row) for row in values]
+    responses = {row.id: [] for row in rows if row.is_simple and not row.is_completed}
+    if responses:
+        for response_id, session_id, question_id, prompt, answer_id, answer_text in (
+                Response.objects.filter(session_id__in=responses)
+                .order_by('session_id', 'question_id', 'selected_answer_id')
+                .values_list(*RESPONSE_COLUMNS)):
+            responses[session_id].append({'id': response_id,
+                                          'session': session_id,
+                                          'question': question_id,
+                                          'question_text': prompt,
+                                          'selected_answer': answer_id,
+                                          'selected_answer_text': answer_text})
+    fallback = QuizSession.objects.in_bulk([row.id for row in rows if not row.is_simple])
+    serializer = QuizSessionSerializer()
+
+    data = []
+    for row in rows:
+        if not row.is_simple:
+            data.append(serializer.to_representation(fallback[row.id]))
+            continue
+        result = row.result
+        item = {'id': row.id, 'user': row.user_id}
+        if row.is_completed:
+            item['user_username'] = result['user_username']
+        elif row.user_id is not None:
+            # The serializer leaves the field out for sessions of deleted users
+            item['user_username'] = row.user__username
+        item.update({
+            'quiz': row.quiz_id,
+            'quiz_title': result['quiz_title'] if row.is_completed else row.quiz__title,
+            'started_at': DATETIME.to_representation(row.started_at),
+            'completed_at': (DATETIME.to_representation(row.completed_at)
+                             if row.completed_at else None),
+            'score': float(row.score),
+            'is_completed': row.is_completed,
+            'question_ids': (unpack_ids(row.question_vector)
+                             if row.question_vector is not None else None),
+            'responses': result['responses'] if row.is_completed else responses[row.id],
+            'result': ({key: value for key, value in result.items() if key != 'responses'}
+                       if result is not None else None),
+        })
+        data.append(item)
+    return data
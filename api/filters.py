@@ -0,0 +1,46 @@
+from django.db.models import Case, Q, When
+from rest_framework.filters import BaseFilterBackend
+
+from quiz import search
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search over the quiz content index.
+    Views declare `search_kind` and `search_fallback_fields`, the latter
+    are matched with icontains on databases without FTS5.
+    """
+    search_param = 'search'
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        if not search.is_supported():
+            condition = Q()
+            for field in view.search_fallback_fields:
+                condition |= Q(**{f'{field}__icontains': query})
+            return queryset.filter(condition).distinct()
+        ids = search.search_ids(view.search_kind, query)
+        if not ids:
+            return queryset.none()
+        rank = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)])
+        return queryset.filter(pk__in=ids).order_by(rank)
+
+
+class UsernamePrefixFilter(BaseFilterBackend):
+    """
+    Case-sensitive username prefix search. Compiles to a range condition,
+    which unlike LIKE can use the unique index on username.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        prefix = request.query_params.get(self.search_param, '').strip()
+        if not prefix:
+            return queryset
+        return queryset.filter(username__gte=prefix,
+                               username__lt=prefix + '\U0010ffff').order_by('username')
@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from api import fastpath
+from api.serializers import AnswerSerializer, QuestionSerializer, QuizSessionSerializer
+from quiz.models import Answer, Question, Quiz
+from session.models import QuizSession
+from session.results import build_missing_results
+
+
+class Command(BaseCommand):
+    help = ('Compares the serializers of the large list endpoints with their values() fast '
+            'paths: checks that both render the same bytes and reports the speedup.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, default=None,
+                            help='Quiz whose sessions and questions are listed '
+                                 '(default: the quiz with the most sessions).')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per path, the fastest one is reported (default: 5).')
+
+    def endpoints(self, quiz_id):
+        sessions = QuizSession.objects.filter(quiz_id=quiz_id)
+        questions = Question.objects.filter(quiz_id=quiz_id)
+        answers = Answer.objects.all()
+        return [
+            ('quizzes/<id>/sessions/', sessions.count(),
+             lambda: QuizSessionSerializer(sessions.all(), many=True).data,
+             lambda: fastpath.session_rows(fastpath.session_values(sessions.all()))),
+            ('quizzes/<id>/get_all_questions/', questions.count(),
+             lambda: QuestionSerializer(questions.all(), many=True).data,
+             lambda: fastpath.question_rows(questions.all())),
+            ('answers/', answers.count(),
+             lambda: AnswerSerializer(answers.all(), many=True).data,
+             lambda: fastpath.answer_rows(answers.all())),
+        ]
+
+    def measure(self, render, repeat):
+        """Returns the rendered bytes and the fastest time of `repeat` runs."""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = JSONRenderer().render(render())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return content, best
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be positive.')
+        quiz_id = options['quiz']
+        if quiz_id is None:
+            quiz_id = (Quiz.objects.annotate(sessions=Count('session'))
+                       .order_by('-sessions', 'id').values_list('id', flat=True).first())
+            if quiz_id is None:
+                raise CommandError('There are no quizzes to benchmark.')
+        elif not Quiz.objects.filter(pk=quiz_id).exists():
+            raise CommandError(f'Quiz not found: {quiz_id}.')
+
+        # Sessions without a stored result document would be built on every
+        # read, by both paths, and hide the difference being measured
+        built = build_missing_results(quiz_id)
+        if built:
+            self.stdout.write(f'Stored {built} missing session result documents.')
+        self.stdout.write(f'Quiz {quiz_id}, fastest of {options["repeat"]} runs:')
+        mismatches = []
+        for name, count, serializer, fast in self.endpoints(quiz_id):
+            expected, serializer_time = self.measure(serializer, options['repeat'])
+            content, fast_time = self.measure(fast, options['repeat'])
+            identical = content == expected
+            if not identical:
+                mismatches.append(name)
+            self.stdout.write(
+                f'  {name:<34} {count:>8} rows  serializer {serializer_time * 1000:>9.1f}ms  '
+                f'fast path {fast_time * 1000:>9.1f}ms  '
+                f'{serializer_time / fast_time if fast_time else 0:>6.1f}x  '
+                f'{"identical" if identical else "DIFFERENT"}')
+        if mismatches:
+            raise CommandError(f'Fast path output differs for: {", ".join(mismatches)}.')
+        self.stdout.write(self.style.SUCCESS('All fast paths match their serializers.'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from api import querylog
+
+
+class Command(BaseCommand):
+    help = ('Reports the statements recorded by the slow query log, aggregated '
+            'by normalized SQL, with their call sites and query plans.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order', choices=('total_ms', 'count', 'max_ms', 'avg_ms'),
+                            default='total_ms', help='Sort key (default: total_ms).')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Number of statements to show (default: 20).')
+        parser.add_argument('--reset', action='store_true',
+                            help='Clear the log after reporting.')
+
+    def handle(self, *args, **options):
+        entries = querylog.report(options['order'], options['limit'])
+        if not entries:
+            self.stdout.write('No slow queries recorded.')
+        for index, entry in enumerate(entries, 1):
+            self.stdout.write(
+                f'#{index} {entry["count"]} calls, total {entry["total_ms"]:.1f}ms, '
+                f'avg {entry["avg_ms"]:.1f}ms, max {entry["max_ms"]:.1f}ms, '
+                f'{entry["params"]} params')
+            self.stdout.write(f'  {entry["sql"]}')
+            for site, count in entry['call_sites'].items():
+                self.stdout.write(f'  {count:>6} x {site}')
+            for line in entry['plan']:
+                self.stdout.write(f'  plan: {line}')
+            self.stdout.write('')
+        if options['reset']:
+            querylog.reset()
+            self.stdout.write('Slow query log cleared.')
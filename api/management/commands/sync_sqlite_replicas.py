@@ -0,0 +1,27 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Copies the default SQLite database into every configured replica file, '
+            'so a local setup can exercise read replica routing.')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Only SQLite databases can be synced with this command.')
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured, set DATABASE_REPLICAS.')
+        source = sqlite3.connect(primary['NAME'])
+        try:
+            for alias in settings.REPLICA_DATABASES:
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'Synced {alias} from default.')
+        finally:
+            source.close()
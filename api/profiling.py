@@ -0,0 +1,258 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+DEFAULTS = {
+    'ENABLED': False,
+    'VIEWS': [],
+    'THRESHOLD_MS': 500,
+    'SAMPLE_RATE': 0.0,
+    'INTERVAL_MS': 5,
+    'HEADER': 'X-Profile',
+    'HEADER_MAX_AGE': 3600,
+    'DIRECTORY': 'profiles',
+    'MAX_FILES': 200,
+    'MAX_DEPTH': 64,
+}
+SIGNING_SALT = 'api.profiling'
+PROFILE_NAME = re.compile(r'^[\w.-]+\.txt\Z')
+# Call tree nodes below this share of the samples are left out
+TREE_MIN_SHARE = 0.01
+TOP_FUNCTIONS = 30
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'PROFILER', {})}
+
+
+class Sampler:
+    """
+    One background thread that periodically records the stacks of the
+    threads currently being profiled, read from sys._current_frames().
+
+    The thread sleeps on an event while no thread is registered, so it
+    costs nothing between profiled requests.
+    """
+
+    def __init__(self, interval, max_depth):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, ident):
+        with self._lock:
+            self._stacks[ident] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler-sampler',
+                                                daemon=True)
+                self._thread.start()
+            self._wakeup.set()
+
+    def stop(self, ident):
+        """Stops sampling the thread and returns its stack counts."""
+        with self._lock:
+            return self._stacks.pop(ident, Counter())
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                idents = list(self._stacks)
+                if not idents:
+                    self._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            stacks = [(ident, self._stack(frames[ident])) for ident in idents if ident in frames]
+            del frames
+            with self._lock:
+                for ident, stack in stacks:
+                    counts = self._stacks.get(ident)
+                    if counts is not None:
+                        counts[stack] += 1
+            time.sleep(self.interval)
+
+
+def sign_debug_header():
+    """Returns a value for the debug header that forces profiling."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def _describe(function):
+    filename, lineno, name = function
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f'{name} ({filename}:{lineno})'
+
+
+def format_profile(stacks, meta):
+    """Renders the top functions and the call tree of the sampled stacks."""
+    total = sum(stacks.values())
+    own = Counter()
+    inclusive = Counter()
+    tree = {}
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for function in set(stack):
+            inclusive[function] += count
+        node = tree
+        for function in stack:
+            entry = node.setdefault(function, [0, {}])
+            entry[0] += count
+            node = entry[1]
+
+    lines = [f'{key}: {value}' for key, value in meta.items()]
+    lines.append(f'samples: {total}')
+    lines += ['', 'Top functions (own samples, total samples):']
+    for function, count in own.most_common(TOP_FUNCTIONS):
+        lines.append(f'{count:>8} {count / total:>7.1%} {inclusive[function]:>8} '
+                     f'{inclusive[function] / total:>7.1%}  {_describe(function)}')
+    lines += ['', 'Call tree (total samples):']
+
+    def walk(node, depth):
+        for function, (count, children) in sorted(node.items(), key=lambda item: -item[1][0]):
+            if count < total * TREE_MIN_SHARE:
+                continue
+            lines.append(f'{count:>8} {count / total:>7.1%}  {"  " * depth}{_describe(function)}')
+            walk(children, depth + 1)
+
+    if total:
+        walk(tree, 0)
+    return '\n'.join(lines) + '\n'
+
+
+def list_profiles():
+    """Returns the stored profiles, newest first."""
+    directory = get_options()['DIRECTORY']
+    try:
+        entries = [entry for entry in os.scandir(directory)
+                   if entry.is_file() and PROFILE_NAME.match(entry.name)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda entry: entry.name, reverse=True)
+    return [{'name': entry.name,
+             'size': entry.stat().st_size,
+             'created_at': datetime.fromtimestamp(entry.stat().st_mtime).isoformat()}
+            for entry in entries]
+
+
+def profile_path(name):
+    """Returns the path of a stored profile or None."""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(get_options()['DIRECTORY'], name)
+    return path if os.path.isfile(path) else None
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profiles requests to the configured views with a sampling profiler and
+    keeps the profiles of requests that were slower than THRESHOLD_MS,
+    carried a valid signed debug header or were randomly sampled.
+
+    Raises MiddlewareNotUsed unless PROFILER['ENABLED'] is set, so it adds
+    no overhead when profiling is off.
+    """
+
+    def __init__(self, get_response):
+        options = get_options()
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.views = set(options['VIEWS'])
+        self.threshold = options['THRESHOLD_MS'] / 1000
+        self.sample_rate = options['SAMPLE_RATE']
+        self.header = 'HTTP_' + options['HEADER'].upper().replace('-', '_')
+        self.header_max_age = options['HEADER_MAX_AGE']
+        self.directory = options['DIRECTORY']
+        self.max_files = options['MAX_FILES']
+        self.sampler = Sampler(options['INTERVAL_MS'] / 1000, options['MAX_DEPTH'])
+        self._write_lock = threading.Lock()
+
+    def __call__(self, request):
+        request._profiled_view = None
+        started = time.perf_counter()
+        response = self.get_response(request)
+        if request._profiled_view is not None:
+            self._finish(request, response, time.perf_counter() - started)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        view_name = view_class.__name__ if view_class else view_func.__name__
+        if view_name not in self.views:
+            return None
+        actions = getattr(view_func, 'actions', None)
+        if actions and request.method.lower() in actions:
+            view_name = f'{view_name}.{actions[request.method.lower()]}'
+        request._profiled_view = view_name
+        self.sampler.start(threading.get_ident())
+        return None
+
+    def _trigger(self, request, elapsed):
+        value = request.META.get(self.header)
+        if value:
+            try:
+                signing.TimestampSigner(salt=SIGNING_SALT).unsign(value,
+                                                                  max_age=self.header_max_age)
+                return 'header'
+            except signing.BadSignature:
+                pass
+        if elapsed >= self.threshold:
+            return 'threshold'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def _finish(self, request, response, elapsed):
+        stacks = self.sampler.stop(threading.get_ident())
+        trigger = self._trigger(request, elapsed)
+        if trigger is None or not stacks:
+            return
+        now = datetime.now()
+        meta = {
+            'view': request._profiled_view,
+            'request': f'{request.method} {request.get_full_path()}',
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 1),
+            'trigger': trigger,
+            'recorded_at': now.isoformat(),
+            'interval_ms': round(self.sampler.interval * 1000, 1),
+        }
+        name = (f'{now:%Y%m%d-%H%M%S-%f}-{request._profiled_view}-'
+                f'{round(elapsed * 1000)}ms.txt')
+        self._write(name, format_profile(stacks, meta))
+
+    def _write(self, name, content):
+        """Writes the profile and removes the oldest ones beyond MAX_FILES."""
+        with self._write_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), 'w') as file:
+                file.write(content)
+            names = sorted(entry for entry in os.listdir(self.directory)
+                           if PROFILE_NAME.match(entry))
+            for stale in names[:max(len(names) - self.max_files, 0)]:
+                try:
+                    os.remove(os.path.join(self.directory, stale))
+                except FileNotFoundError:
+                    pass
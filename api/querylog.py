@@ -0,0 +1,246 @@
+import atexit
+import fcntl
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.views import View
+from rest_framework.fields import Field
+
+DEFAULTS = {
+    'ENABLED': False,
+    'THRESHOLD_MS': 100,
+    'FILE': 'slow_queries.json',
+    'FLUSH_INTERVAL': 10,
+    'CALL_SITES': 5,
+}
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'QUERY_LOG', {})}
+
+
+def normalize(sql):
+    """Replaces literals and placeholder lists so equal query shapes match."""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = PLACEHOLDER_LIST.sub('(...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def call_site(frame):
+    """
+    Describes where a query was issued from: the view and action, the
+    serializer field being rendered and the innermost project code line.
+    """
+    view = field = code = None
+    base_dir = str(settings.BASE_DIR)
+    while frame is not None and view is None:
+        owner = frame.f_locals.get('self')
+        if field is None and isinstance(owner, Field) and owner.field_name:
+            field = f'{type(owner.parent).__name__}.{owner.field_name}'
+        elif isinstance(owner, View):
+            view = f'{type(owner).__name__}.{getattr(owner, "action", None) or frame.f_code.co_name}'
+        if (code is None and frame.f_code.co_filename.startswith(base_dir)
+                and frame.f_code.co_filename != __file__):
+            code = (f'{os.path.relpath(frame.f_code.co_filename, base_dir)}:'
+                    f'{frame.f_lineno} in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return ' / '.join(part for part in (view, field, code) if part) or 'unknown'
+
+
+def explain(connection, sql, params):
+    """Returns the query plan lines, run on a raw cursor outside the wrappers."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return []
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{connection.ops.explain_prefix} {sql}', params or ())
+        if connection.vendor == 'sqlite':
+            # Rows are (id, parent, notused, detail)
+            return [row[-1] for row in cursor.fetchall()]
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'Unable to explain: {error}']
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """
+    Aggregates statements slower than the threshold by their normalized SQL
+    in process memory and merges them into a JSON file shared by all
+    processes at most every `flush_interval` seconds.
+    """
+
+    def __init__(self, options):
+        self.threshold = options['THRESHOLD_MS'] / 1000
+        self.path = options['FILE']
+        self.flush_interval = options['FLUSH_INTERVAL']
+        self.call_sites = options['CALL_SITES']
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._next_flush = time.monotonic() + self.flush_interval
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.threshold:
+                self.record(context['connection'], sql, params, many, duration)
+
+    def record(self, connection, sql, params, many, duration):
+        normalized = normalize(sql)
+        site = call_site(sys._getframe(2))
+        with self._lock:
+            entry = self._pending.get(normalized)
+            needs_plan = entry is None
+        plan = explain(connection, sql, params) if needs_plan and not many else None
+        with self._lock:
+            entry = self._pending.setdefault(normalized, {
+                'sql': normalized, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'params': 0, 'plan': [], 'call_sites': Counter(),
+            })
+            entry['count'] += 1
+            entry['total_ms'] += duration * 1000
+            entry['max_ms'] = max(entry['max_ms'], duration * 1000)
+            entry['params'] = len(params[0] if many and params else params or ())
+            entry['call_sites'][site] += 1
+            entry['last_seen'] = datetime.now().isoformat()
+            if plan:
+                entry['plan'] = plan
+            due = time.monotonic() >= self._next_flush
+        if due:
+            self.flush()
+
+    def _restore(self, pending):
+        """Puts statements that could not be written back into the pending ones."""
+        with self._lock:
+            for sql, entry in pending.items():
+                newer = self._pending.get(sql)
+                if newer is None:
+                    self._pending[sql] = entry
+                    continue
+                newer['count'] += entry['count']
+                newer['total_ms'] += entry['total_ms']
+                newer['max_ms'] = max(newer['max_ms'], entry['max_ms'])
+                newer['call_sites'].update(entry['call_sites'])
+                newer['plan'] = newer['plan'] or entry['plan']
+
+    def flush(self, block=False):
+        """
+        Merges the pending statements into the log file. Unless `block` is
+        set, a file locked by another process is retried on the next flush
+        instead of holding up the request that triggered this one.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._next_flush = time.monotonic() + self.flush_interval
+        if not pending:
+            return
+        with locked(self.path, block) as acquired:
+            if not acquired:
+                self._restore(pending)
+                return
+            entries = {entry['sql']: entry for entry in read_entries(self.path)}
+            for sql, update in pending.items():
+                entry = entries.setdefault(sql, {**update, 'count': 0, 'total_ms': 0.0,
+                                                 'max_ms': 0.0, 'call_sites': {}})
+                entry['count'] += update['count']
+                entry['total_ms'] = round(entry['total_ms'] + update['total_ms'], 3)
+                entry['max_ms'] = round(max(entry['max_ms'], update['max_ms']), 3)
+                entry['params'] = update['params']
+                entry['last_seen'] = update['last_seen']
+                entry['plan'] = update['plan'] or entry['plan']
+                sites = Counter(entry['call_sites'])
+                sites.update(update['call_sites'])
+                entry['call_sites'] = dict(sites.most_common(self.call_sites))
+            write_entries(self.path, entries.values())
+
+
+@contextmanager
+def locked(path, block=True):
+    """
+    Holds an exclusive fcntl lock on the lock file next to the log file
+    and yields whether it was taken, which is always the case if `block`.
+    """
+    # The lock file is never deleted, unlinking it while it is waited on would break the lock
+    fd = os.open(f'{path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if block else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+def read_entries(path=None):
+    """Returns the aggregated slow statements stored in the log file."""
+    try:
+        with open(path or get_options()['FILE']) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def write_entries(path, entries):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(list(entries), file, indent=1)
+    os.replace(temporary, path)
+
+
+def report(order='total_ms', limit=None):
+    """Returns the stored slow statements, most expensive first."""
+    entries = read_entries()
+    for entry in entries:
+        entry['avg_ms'] = round(entry['total_ms'] / entry['count'], 3)
+    entries.sort(key=lambda entry: entry[order], reverse=True)
+    return entries[:limit] if limit else entries
+
+
+def reset():
+    path = get_options()['FILE']
+    with locked(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_log = None
+_install_lock = threading.Lock()
+
+
+def install(connection):
+    """Wraps every statement run on the connection with the slow query log."""
+    global _log
+    options = get_options()
+    if not options['ENABLED']:
+        return
+    with _install_lock:
+        if _log is None:
+            _log = SlowQueryLog(options)
+            atexit.register(partial(_log.flush, block=True))
+    if _log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_log)
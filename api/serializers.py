@@ -1,6 +1,8 @@
 from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 
+from quiz.counters import counters
 from quiz.models import Answer, Question, Quiz
 from session.models import QuizSession, Response
 from users.models import User
@@ -25,6 +27,20 @@ class TokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField(required=True)
 
 
+class BatchItemSerializer(serializers.Serializer):
+    """Single sub-request of a batch."""
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    url = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Batch request serializer."""
+    requests = BatchItemSerializer(many=True, allow_empty=False,
+                                   max_length=settings.BATCH_MAX_REQUESTS)
+    parallel = serializers.BooleanField(default=False)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User model serializer."""
 
@@ -51,10 +67,13 @@ class QuizSerializer(serializers.ModelSerializer):
 
     author_full_name = serializers.SerializerMethodField('getFullName')
     question_count = serializers.SerializerMethodField('getQuestionCount')
+    average_score = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'author', 'author_full_name', 'question_count', 'created_at', 'questions']
+        fields = ['id', 'title', 'author', 'author_full_name', 'question_count', 'sample_size', 'created_at',
+                  'times_taken', 'completions', 'average_score', 'questions']
+        read_only_fields = ['times_taken', 'completions']
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -88,11 +107,62 @@ class ResponseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'question_text', 'selected_answer_text']
 
 
+class AnswerUpsertSerializer(serializers.Serializer):
+    """In-progress answers to one question of a session."""
+    question = serializers.IntegerField()
+    selected_answers = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+
+    def validate(self, data):
+        """Check that the question belongs to the session and the answers to the question."""
+        session = self.context['session']
+        question_ids = session.question_ids
+        if question_ids is not None and data['question'] not in question_ids:
+            raise serializers.ValidationError({'question': 'The question was not drawn for this session.'})
+        if not Question.objects.filter(pk=data['question'], quiz_id=session.quiz_id).exists():
+            raise serializers.ValidationError({'question': 'The question does not belong to the quiz.'})
+        selected = set(data['selected_answers'])
+        if Answer.objects.filter(pk__in=selected, question_id=data['question']).count() != len(selected):
+            raise serializers.ValidationError({'selected_answers': 'Answers must belong to the question.'})
+        return data
+
+
+class QuizHistorySerializer(serializers.Serializer):
+    """Scores of one user on one quiz."""
+    quiz = serializers.IntegerField()
+    quiz_title = serializers.CharField()
+    attempts = serializers.IntegerField()
+    best_score = serializers.FloatField()
+    latest_score = serializers.FloatField()
+    average_score = serializers.FloatField()
+    first_completed_at = serializers.DateTimeField()
+    last_completed_at = serializers.DateTimeField()
+
+
+class TrendPointSerializer(serializers.Serializer):
+    """Scores of one user in one period."""
+    period = serializers.DateTimeField()
+    attempts = serializers.IntegerField()
+    average_score = serializers.FloatField()
+    best_score = serializers.FloatField()
+
+
+class HistorySerializer(serializers.Serializer):
+    """Score history and trend of one user across quizzes."""
+    attempts = serializers.IntegerField()
+    best_score = serializers.FloatField(allow_null=True)
+    average_score = serializers.FloatField(allow_null=True)
+    bucket = serializers.CharField()
+    quizzes = QuizHistorySerializer(many=True)
+    trend = TrendPointSerializer(many=True)
+
+
 class QuizSessionSerializer(serializers.ModelSerializer):
     """QuizSession model serializer."""
     user_username = serializers.CharField(source='user.username', read_only=True)
     quiz_title = serializers.CharField(source='quiz.title', read_only=True)
-    responses = ResponseSerializer(many=True, read_only=True)
+    question_ids = serializers.SerializerMethodField('getQuestionIds')
+    responses = serializers.SerializerMethodField('getResponses')
+    result = serializers.SerializerMethodField('getResult')
     score = serializers.FloatField(read_only=True)
     is_completed = serializers.BooleanField(read_only=True)
     started_at = serializers.DateTimeField(read_only=True)
@@ -101,12 +171,64 @@ class QuizSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizSession
         fields = ['id', 'user', 'user_username', 'quiz', 'quiz_title', 'started_at',
-                  'completed_at', 'score', 'is_completed', 'responses']
+                  'completed_at', 'score', 'is_completed', 'question_ids', 'responses', 'result']
         read_only_fields = ['id', 'user_username', 'quiz_title', 'score', 'is_completed', 'started_at', 'completed_at']
 
+    def to_representation(self, instance):
+        """Completed sessions are rendered from their stored result document alone."""
+        if not instance.is_completed:
+            return super().to_representation(instance)
+        result = instance.get_result()
+        return {
+            'id': instance.pk,
+            'user': instance.user_id,
+            'user_username': result['user_username'],
+            'quiz': instance.quiz_id,
+            'quiz_title': result['quiz_title'],
+            'started_at': self.fields['started_at'].to_representation(instance.started_at),
+            'completed_at': (self.fields['completed_at'].to_representation(instance.completed_at)
+                             if instance.completed_at else None),
+            'score': instance.score,
+            'is_completed': True,
+            'question_ids': instance.question_ids,
+            'responses': result['responses'],
+            'result': self.getResult(instance),
+        }
+
+    def getResult(self, obj):
+        """Get the result document of a completed session."""
+        if obj.result is None:
+            return None
+        return {key: value for key, value in obj.result.items() if key != 'responses'}
+
+    def getQuestionIds(self, obj):
+        """Get ids of the questions drawn for the session, in the order they are asked."""
+        return obj.question_ids
+
+    def getResponses(self, obj):
+        """
+        Get session responses in question order, from the packed answer vector
+        once completed. Packed responses no longer have an id.
+        """
+        if not obj.is_packed:
+            return ResponseSerializer(obj.responses.order_by('question_id', 'selected_answer_id'),
+                                      many=True).data
+        answer_ids = obj.answer_ids
+        answers = Answer.objects.select_related('question').in_bulk(set(answer_ids))
+        return [{'id': None,
+                 'session': obj.pk,
+                 'question': answers[answer_id].question_id,
+                 'question_text': answers[answer_id].question.prompt,
+                 'selected_answer': answer_id,
+                 'selected_answer_text': answers[answer_id].answer_text}
+                for answer_id in answer_ids if answer_id in answers]
+
     def create(self, validated_data):
         """Ensures that responses are not part of the creation process for QuizSession"""
         responses_data = validated_data.pop('responses', None)
-        quiz_session = super().create(validated_data)
+        quiz_session = QuizSession(**validated_data)
+        quiz_session.draw_questions()
+        quiz_session.save()
+        transaction.on_commit(lambda: counters.add(quiz_session.quiz_id, times_taken=1))
         # Responses should be created separately, typically after the session is started
         return quiz_session
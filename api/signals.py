@@ -0,0 +1,43 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from api import querylog
+from api.cache import api_cache
+from quiz.models import Answer, Question, Quiz
+from users.models import User
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_quiz_content(sender, **kwargs):
+    """Drops cached quiz reads whenever quiz content changes."""
+    api_cache.bump('quizzes')
+
+
+@receiver(pre_save, sender=User)
+def invalidate_renamed_user(sender, instance, **kwargs):
+    """Drops cached reads of the old username when a user is renamed."""
+    if instance.pk is None:
+        return
+    old_username = (User.objects.filter(pk=instance.pk)
+                    .values_list('username', flat=True).first())
+    if old_username and old_username != instance.username:
+        api_cache.bump(f'users:{old_username}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    """Drops cached reads of the user."""
+    api_cache.bump(f'users:{instance.username}')
+
+
+@receiver(connection_created)
+def install_slow_query_log(sender, connection, **kwargs):
+    """Records slow statements of every new database connection."""
+    querylog.install(connection)
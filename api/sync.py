@@ -0,0 +1,252 @@
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.events import broker
+from quiz.counters import counters
+from quiz.models import Answer, Quiz
+from session import analytics, history, leaderboard
+from session.models import QuizSession
+from session.packing import pack_ids
+from session.results import build_result, load_content
+
+MAX_ATTEMPT_ID_LENGTH = QuizSession._meta.get_field('client_attempt_id').max_length
+
+
+class QuizKey:
+    """Questions, answer key and result content of a quiz, loaded once per sync request."""
+
+    def __init__(self, quiz):
+        self.quiz = quiz
+        self.content = load_content(quiz.pk)
+        self.question_ids = list(self.content['prompts'])
+        self.answers = {answer_id: (question_id, is_correct)
+                        for answer_id, question_id, is_correct in
+                        Answer.objects.filter(question__quiz=quiz)
+                        .values_list('id', 'question_id', 'is_correct')}
+
+
+def read_lines(request):
+    """Yields (line number, raw line) of an NDJSON request body without buffering it."""
+    max_bytes = settings.SYNC_MAX_LINE_BYTES
+    number = 0
+    while True:
+        line = request.readline(max_bytes + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > max_bytes and not line.endswith(b'\n'):
+            # Skip the rest of the oversized line
+            while line and not line.endswith(b'\n'):
+                line = request.readline(max_bytes + 1)
+            yield number, None
+        elif line.strip():
+            yield number, line
+
+
+def chunks(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_attempt(raw):
+    """Returns the attempt fields of one NDJSON line or raises ValueError."""
+    if raw is None:
+        raise ValueError({'detail': f'Line longer than {settings.SYNC_MAX_LINE_BYTES} bytes.'})
+    try:
+        data = json.loads(raw)
+    except (UnicodeDecodeError, ValueError):
+        raise ValueError({'detail': 'Invalid JSON.'})
+    if not isinstance(data, dict):
+        raise ValueError({'detail': 'Expected an attempt object.'})
+    errors = {}
+    attempt_id = data.get('attempt_id')
+    if not isinstance(attempt_id, str) or not attempt_id or len(attempt_id) > MAX_ATTEMPT_ID_LENGTH:
+        errors['attempt_id'] = f'A string of at most {MAX_ATTEMPT_ID_LENGTH} characters is required.'
+    if not isinstance(data.get('quiz'), int):
+        errors['quiz'] = 'A valid integer is required.'
+    answers = data.get('answers')
+    if (not isinstance(answers, list)
+            or not all(isinstance(answer, dict)
+                       and isinstance(answer.get('question'), int)
+                       and isinstance(answer.get('selected_answers'), list)
+                       and all(isinstance(answer_id, int) for answer_id in answer['selected_answers'])
+                       for answer in answers)):
+        errors['answers'] = 'Expected a list of {"question": id, "selected_answers": [ids]}.'
+    question_ids = data.get('question_ids')
+    if question_ids is not None and (not isinstance(question_ids, list)
+                                     or not all(isinstance(question_id, int)
+                                                for question_id in question_ids)):
+        errors['question_ids'] = 'Expected a list of question ids.'
+    completed_at = data.get('completed_at')
+    if completed_at is not None:
+        completed_at = parse_datetime(completed_at) if isinstance(completed_at, str) else None
+        if completed_at is None:
+            errors['completed_at'] = 'Expected an ISO 8601 datetime.'
+        elif timezone.is_naive(completed_at):
+            completed_at = timezone.make_aware(completed_at)
+    if errors:
+        raise ValueError(errors)
+    return {'attempt_id': attempt_id, 'quiz': data['quiz'], 'answers': answers,
+            'question_ids': question_ids, 'completed_at': completed_at}
+
+
+def grade(attempt, key):
+    """
+    Validates the answers of an attempt against the quiz key and grades it
+    like QuizSession.calculate_score. Returns the response rows, the drawn
+    question ids (None without a question pool) and the score.
+    """
+    quiz_questions = set(key.question_ids)
+    drawn = attempt['question_ids']
+    if key.quiz.sample_size:
+        if drawn is None or len(drawn) != min(key.quiz.sample_size, len(key.question_ids)):
+            raise ValueError({'question_ids': f'The {key.quiz.sample_size} questions '
+                                              f'drawn for the attempt are required.'})
+        if len(set(drawn)) != len(drawn) or not set(drawn) <= quiz_questions:
+            raise ValueError({'question_ids': 'Questions must be distinct questions of the quiz.'})
+        allowed = set(drawn)
+        total = len(drawn)
+    else:
+        drawn = None
+        allowed = quiz_questions
+        total = len(key.question_ids)
+    if not total:
+        raise ValueError({'quiz': 'The quiz has no questions.'})
+
+    rows = []
+    for answer in attempt['answers']:
+        question_id = answer['question']
+        if question_id not in allowed:
+            raise ValueError({'answers': f'Question {question_id} is not part of the attempt.'})
+        for answer_id in set(answer['selected_answers']):
+            answer_question_id, is_correct = key.answers.get(answer_id, (None, False))
+            if answer_question_id != question_id:
+                raise ValueError({'answers': f'Answer {answer_id} does not belong to '
+                                             f'question {question_id}.'})
+            rows.append((question_id, answer_id, is_correct))
+    rows.sort()
+    score = sum(1 for _, _, is_correct in rows if is_correct) / total * 100
+    return rows, drawn, score
+
+
+def _import_chunk(user, attempts, keys, results):
+    """Grades the new attempts of a chunk and inserts them in one transaction."""
+    existing = dict(QuizSession.objects
+                    .filter(user=user,
+                            client_attempt_id__in=[attempt['attempt_id'] for _, attempt in attempts])
+                    .values_list('client_attempt_id', 'id'))
+    created = {}
+    graded = []
+    for number, attempt in attempts:
+        attempt_id = attempt['attempt_id']
+        if attempt_id in existing or attempt_id in created:
+            results[number] = {'line': number, 'attempt_id': attempt_id, 'status': 'duplicate',
+                               'session': existing.get(attempt_id, created.get(attempt_id))}
+            continue
+        key = keys.get(attempt['quiz'])
+        try:
+            if key is None:
+                raise ValueError({'quiz': 'Quiz not found.'})
+            rows, drawn, score = grade(attempt, key)
+        except ValueError as error:
+            results[number] = {'line': number, 'attempt_id': attempt_id,
+                               'status': 'error', 'errors': error.args[0]}
+            continue
+        created[attempt_id] = QuizSession(
+            user=user,
+            quiz=key.quiz,
+            client_attempt_id=attempt_id,
+            completed_at=attempt['completed_at'] or timezone.now(),
+            score=score,
+            is_completed=True,
+            answer_vector=pack_ids([answer_id for _, answer_id, _ in rows]),
+            question_vector=pack_ids(drawn) if drawn is not None else None,
+        )
+        graded.append((number, created[attempt_id], rows))
+
+    with transaction.atomic():
+        sessions = QuizSession.objects.bulk_create([session for _, session, _ in graded])
+        # Result documents carry the session ids, which bulk_create has just assigned
+        for _, session, rows in graded:
+            session.result = build_result(session, rows, keys[session.quiz_id].content)
+        QuizSession.objects.bulk_update(sessions, ['result'])
+        _record(user, graded)
+    for number, session, _ in graded:
+        results[number] = {'line': number, 'attempt_id': session.client_attempt_id,
+                           'status': 'created', 'session': session.pk, 'score': session.score}
+    # Duplicates within the chunk point at the session created for the first line
+    for result in results.values():
+        if result['status'] == 'duplicate' and isinstance(result['session'], QuizSession):
+            result['session'] = result['session'].pk
+
+
+def sync_attempts(request, user):
+    """
+    Imports the completed attempts of an NDJSON request body and yields one
+    NDJSON result line per attempt.
+
+    The body is read in chunks of SYNC_CHUNK_SIZE lines. Each chunk is
+    deduplicated by attempt id with one query, graded against answer keys
+    loaded once per quiz and inserted as packed sessions with one
+    bulk_create, plus one bulk_update of their result documents, in its own
+    transaction, so memory stays flat however large the upload is.
+    """
+    keys = {}
+    for chunk in chunks(read_lines(request), settings.SYNC_CHUNK_SIZE):
+        results = {}
+        attempts = []
+        for number, raw in chunk:
+            try:
+                attempts.append((number, parse_attempt(raw)))
+            except ValueError as error:
+                results[number] = {'line': number, 'status': 'error', 'errors': error.args[0]}
+
+        quiz_ids = {attempt['quiz'] for _, attempt in attempts} - set(keys)
+        for quiz in Quiz.objects.filter(pk__in=quiz_ids):
+            keys[quiz.pk] = QuizKey(quiz)
+
+        try:
+            _import_chunk(user, attempts, keys, results)
+        except IntegrityError:
+            # A concurrent upload created some of the attempts, dedupe again
+            _import_chunk(user, attempts, keys, results)
+        for number in sorted(results):
+            yield json.dumps(results[number]) + '\n'
+
+
+def _publish(quiz_id, events):
+    for event in events:
+        broker.publish(quiz_id, event)
+
+
+def _record(user, graded):
+    """Feeds the new sessions to the rollups, counters, leaderboard, history and live events."""
+    by_quiz = {}
+    for _, session, rows in graded:
+        by_quiz.setdefault(session.quiz_id, []).append((session, rows))
+    transaction.on_commit(lambda: history.invalidate(user.pk))
+    for quiz_id, sessions in by_quiz.items():
+        analytics.record_responses(quiz_id, [row for _, rows in sessions for row in rows])
+        count = len(sessions)
+        score_sum = sum(session.score for session, _ in sessions)
+        events = [{'type': 'completed',
+                   'session': session.pk,
+                   'user': user.username,
+                   'score': session.score,
+                   'completed_at': session.completed_at.isoformat()}
+                  for session, _ in sessions]
+        transaction.on_commit(lambda quiz_id=quiz_id, count=count, score_sum=score_sum:
+                              counters.add(quiz_id, times_taken=count, completions=count,
+                                           score_sum=score_sum))
+        transaction.on_commit(lambda quiz_id=quiz_id: leaderboard.invalidate(quiz_id))
+        transaction.on_commit(lambda quiz_id=quiz_id, events=events: _publish(quiz_id, events))
@@ -0,0 +1,192 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import Client, LiveServerTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import api_cache
+from quiz.counters import counters
+from quiz.models import Answer, Question, Quiz
+from session.models import QuizSession
+from users.models import User
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+               'LOCATION': 'api-tests'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES, ANSWER_BUFFER_DIR=tempfile.mkdtemp())
+class APITestBase(APITestCase):
+    """Runs every test on empty caches."""
+
+    def setUp(self):
+        caches['shared'].clear()
+        api_cache.local.clear()
+        # Write buffered counters while the test database still exists
+        self.addCleanup(counters.flush)
+
+
+class UserDetailTests(APITestBase):
+    """User detail endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com',
+                                             password='secret')
+
+    def test_retrieve(self):
+        response = self.client.get('/api/users/alice/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], 'alice')
+        # The second read is served from the cache
+        self.assertEqual(self.client.get('/api/users/alice/').data, response.data)
+
+    def test_retrieve_missing(self):
+        response = self.client.get('/api/users/bob/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_in_batch(self):
+        response = self.client.post(
+            '/api/batch/', {'requests': [{'method': 'GET', 'url': '/api/users/alice/'}]},
+            format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['responses'][0]
+        self.assertEqual(result['status'], status.HTTP_200_OK)
+        self.assertEqual(result['body']['username'], 'alice')
+
+
+class RegradeTests(APITestBase):
+    """Quiz regrade endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='taker', email='taker@example.com',
+                                             password='secret')
+        self.staff = User.objects.create_user(username='staff', email='staff@example.com',
+                                              password='secret', is_staff=True)
+        self.quiz = Quiz.objects.create(author=self.staff, title='Capitals')
+        question = Question.objects.create(quiz=self.quiz, prompt='Capital of Australia?')
+        self.wrong = Answer.objects.create(question=question, answer_text='Sydney',
+                                           is_correct=True)
+        Answer.objects.create(question=question, answer_text='Canberra')
+
+    def take_quiz(self):
+        self.client.force_authenticate(self.user)
+        session_id = self.client.post('/api/sessions/', {'quiz': self.quiz.pk}).data['id']
+        self.client.post('/api/responses/', {'session': session_id,
+                                             'question': self.wrong.question_id,
+                                             'selected_answer': self.wrong.pk})
+        response = self.client.post(f'/api/sessions/{session_id}/calculate_score/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return QuizSession.objects.get(pk=session_id)
+
+    def test_regrade_rebuilds_results(self):
+        session = self.take_quiz()
+        self.assertEqual(session.result['score'], 100)
+        Answer.objects.filter(pk=self.wrong.pk).update(is_correct=False)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.post(f'/api/quizzes/{self.quiz.pk}/regrade/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['changed'], 1)
+        session.refresh_from_db()
+        self.assertEqual(session.score, 0)
+        self.assertIsNotNone(session.result)
+        self.assertEqual(session.result['score'], 0)
+        self.assertEqual(session.result['correct_count'], 0)
+
+    def test_dry_run_keeps_results(self):
+        session = self.take_quiz()
+        Answer.objects.filter(pk=self.wrong.pk).update(is_correct=False)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.post(f'/api/quizzes/{self.quiz.pk}/regrade/?dry_run=1')
+        self.assertEqual(response.data['changed'], 1)
+        session.refresh_from_db()
+        self.assertEqual(session.result['score'], 100)
+
+
+class SyncTests(APITestBase):
+    """Offline attempt sync endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='taker', email='taker@example.com',
+                                             password='secret')
+        self.quiz = Quiz.objects.create(author=self.user, title='Capitals')
+        self.question = Question.objects.create(quiz=self.quiz, prompt='Capital of Italy?')
+        self.right = Answer.objects.create(question=self.question, answer_text='Rome',
+                                           is_correct=True)
+        Question.objects.create(quiz=self.quiz, prompt='Capital of Spain?')
+        self.client.force_authenticate(self.user)
+
+    def sync(self, *attempts):
+        response = self.client.post('/api/sessions/sync/',
+                                    ''.join(json.dumps(attempt) + '\n' for attempt in attempts),
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_sync_stores_results(self):
+        results = self.sync({'attempt_id': 'a1', 'quiz': self.quiz.pk,
+                             'answers': [{'question': self.question.pk,
+                                          'selected_answers': [self.right.pk]}]})
+        self.assertEqual(results[0]['status'], 'created')
+        session = QuizSession.objects.get(pk=results[0]['session'])
+        self.assertEqual(session.score, 50)
+        self.assertIsNotNone(session.result)
+        self.assertEqual(session.result['score'], 50)
+        self.assertEqual(session.result['question_count'], 2)
+        self.assertEqual(session.result['correct_count'], 1)
+        self.assertEqual(session.result['responses'][0]['session'], session.pk)
+        self.assertEqual(session.result['responses'][0]['selected_answer_text'], 'Rome')
+
+    def test_sync_duplicate(self):
+        attempt = {'attempt_id': 'a1', 'quiz': self.quiz.pk, 'answers': []}
+        created = self.sync(attempt)[0]
+        duplicate = self.sync(attempt)[0]
+        self.assertEqual(duplicate['status'], 'duplicate')
+        self.assertEqual(duplicate['session'], created['session'])
+
+
+@override_settings(CACHES=TEST_CACHES, ANSWER_BUFFER_DIR=tempfile.mkdtemp())
+class TakeQuizTests(LiveServerTestCase):
+    """HTML flow: the take-quiz form calls the API of the live server."""
+
+    def setUp(self):
+        caches['shared'].clear()
+        api_cache.local.clear()
+        self.taker = User.objects.create_user(username='taker', email='taker@example.com',
+                                              password='secret')
+        self.quiz = Quiz.objects.create(author=self.taker, title='Capitals')
+        question = Question.objects.create(quiz=self.quiz, prompt='Capital of France?')
+        self.right = Answer.objects.create(question=question, answer_text='Paris', is_correct=True)
+        Answer.objects.create(question=question, answer_text='Lyon')
+        api_base_url = self.settings(API_BASE_URL=f'{self.live_server_url}/api/')
+        api_base_url.enable()
+        self.addCleanup(api_base_url.disable)
+        token = mock.patch.dict(os.environ, {'JWT_TOKEN': f'Bearer {AccessToken.for_user(self.taker)}'})
+        token.start()
+        self.addCleanup(token.stop)
+        # Write buffered counters while the test database still exists
+        self.addCleanup(counters.flush)
+
+    def test_take_quiz_shows_result(self):
+        browser = Client()
+        response = browser.post(f'/quizzes/{self.quiz.pk}/take/', {'responses': [self.right.pk]})
+        session = QuizSession.objects.get(quiz=self.quiz)
+        self.assertRedirects(response, f'/sessions/{session.pk}/result/',
+                             fetch_redirect_response=False)
+        result = browser.get(response['Location'])
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertContains(result, 'Capitals')
+        # Other browsers don't see the result
+        other = Client().get(response['Location'])
+        self.assertEqual(other.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from api.views import (SignUpView, TokenView,
+from api.views import (BatchView, ProfileDetailView, ProfileListView, SignUpView, SlowQueryView, TokenView, quiz_events,
                        AnswerViewSet, QuestionViewSet, QuizViewSet, QuizSessionViewSet, ResponseViewSet, UserViewSet)
 
 router = routers.SimpleRouter()
@@ -16,4 +16,9 @@ urlpatterns = [
     path('', include(router.urls)),
     path('auth/signup/', SignUpView.as_view()),
     path('auth/token/', TokenView.as_view()),
+    path('batch/', BatchView.as_view()),
+    path('profiles/', ProfileListView.as_view()),
+    path('profiles/<str:name>/', ProfileDetailView.as_view()),
+    path('slow-queries/', SlowQueryView.as_view()),
+    path('quizzes/<int:quiz_id>/events/', quiz_events),
 ]
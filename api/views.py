@@ -1,27 +1,43 @@
+import asyncio
+import json
 import os
 
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import send_mail
 from django.db import IntegrityError
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from dotenv import load_dotenv
 from rest_framework import (viewsets,
                             status)
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
+from api import fastpath, profiling, querylog
+from api.batch import run_batch, unbatchable
+from api.cache import api_cache
+from api.events import broker
+from api.filters import FullTextSearchFilter, UsernamePrefixFilter
 from api.permissions import (IsAdminOrSuperuser,
                              IsAdminSuperuserOrReadOnly,
                              IsStaffAdminOrReadOnly,
                              IsStaffOrAdmin)
 from api.serializers import (AnswerSerializer,
+                             AnswerUpsertSerializer,
+                             BatchSerializer,
+                             HistorySerializer,
                              QuestionSerializer,
                              QuizSerializer,
                              QuizSessionSerializer,
@@ -29,14 +45,22 @@ from api.serializers import (AnswerSerializer,
                              SignUpSerializer,
                              TokenSerializer,
                              UserSerializer)
+from api.sync import sync_attempts
+from oper.db_router import (enable_replica_reads, is_pinned, pin_to_primary, reads_from_replica,
+                            reset_replica_reads)
 from quiz.models import Answer, Question, Quiz
+from session import analytics, answer_buffer, history, leaderboard, regrade
 from session.models import QuizSession, Response as UserResponse
 from users.models import User
+from users.provisioning import parse_users, provision_users
 
 
 load_dotenv()
 
 API_BASE_URL = getattr(settings, 'API_BASE_URL', 'http://127.0.0.1:8000/api/')
+# Browser session key listing the quiz sessions taken through TakeQuizView
+TAKEN_SESSIONS_KEY = 'taken_quiz_sessions'
+TAKEN_SESSIONS_LIMIT = 20
 
 
 class SignUpView(APIView):
@@ -81,14 +105,156 @@ class TokenView(APIView):
                         status=status.HTTP_400_BAD_REQUEST)
 
 
+class ReplicaReadMixin:
+    """Serves safe requests from a read replica unless the user wrote recently."""
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user):
+            self._replica_token = enable_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            reset_replica_reads(self._replica_token)
+            self._replica_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_or_set_cached(self, key, producer):
+        """
+        Caches replica reads apart from primary reads, so users pinned to the
+        primary never get a value filled from a lagging replica. Replica
+        entries only live for REPLICA_PIN_SECONDS, the lag pinning allows for.
+        """
+        if reads_from_replica():
+            return api_cache.get_or_set(f'{key}:replica', producer, settings.REPLICA_PIN_SECONDS)
+        return api_cache.get_or_set(key, producer)
+
+
+class BatchView(APIView):
+    """Runs several API requests in-process and returns all results at once."""
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = run_batch(request._request,
+                            request.user,
+                            request.auth,
+                            serializer.validated_data['requests'],
+                            serializer.validated_data['parallel'])
+        return Response({'responses': results}, status=status.HTTP_200_OK)
+
+
+class ProfileListView(APIView):
+    """Lists the stored request profiles and issues debug header values."""
+    permission_classes = (IsStaffOrAdmin,)
+
+    def get(self, request):
+        return Response(profiling.list_profiles())
+
+    def post(self, request):
+        options = profiling.get_options()
+        return Response({'header': options['HEADER'],
+                         'value': profiling.sign_debug_header(),
+                         'max_age': options['HEADER_MAX_AGE']})
+
+
+class ProfileDetailView(APIView):
+    """Downloads a stored request profile."""
+    permission_classes = (IsStaffOrAdmin,)
+
+    def get(self, request, name):
+        path = profiling.profile_path(name)
+        if path is None:
+            raise Http404
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name,
+                            content_type='text/plain')
+
+
+class SlowQueryView(APIView):
+    """Reports the slow query log, most expensive statements first."""
+    permission_classes = (IsStaffOrAdmin,)
+    orders = ('total_ms', 'count', 'max_ms', 'avg_ms')
+
+    def get(self, request):
+        order = request.query_params.get('order', 'total_ms')
+        if order not in self.orders:
+            raise ValidationError({'order': [f'Must be one of {", ".join(self.orders)}.']})
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        return Response(querylog.report(order, limit))
+
+    def delete(self, request):
+        querylog.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """User model view set."""
     queryset = User.objects.all()
     permission_classes = (AllowAny,)  # (IsAdminOrSuperuser,)
     serializer_class = UserSerializer
     lookup_field = 'username'
-    filter_backends = (SearchFilter,)
-    search_fields = ('username',)
+    filter_backends = (UsernamePrefixFilter,)
+
+    def retrieve(self, request, *args, **kwargs):
+        username = kwargs[self.lookup_field]
+        key = api_cache.key(f'users:{username}', 'detail')
+        data = api_cache.get_or_set(
+            key, lambda: self.get_serializer(self.get_object()).data)
+        return Response(data)
+
+    @action(detail=False,
+            methods=('POST',),
+            permission_classes=(IsStaffOrAdmin,),)
+    def bulk(self, request):
+        """
+        Provisions users from a JSON list, a CSV body (text/csv) or a
+        CSV/JSON `file` upload. `?tokens=1` returns an access token per
+        user and `?email=0` skips the confirmation emails.
+        """
+        try:
+            if request.content_type.startswith('text/csv'):
+                rows = parse_users(request.body, 'csv')
+            elif 'file' in request.FILES:
+                upload = request.FILES['file']
+                fmt = 'json' if upload.name.lower().endswith('.json') else 'csv'
+                rows = parse_users(upload.read(), fmt)
+            else:
+                rows = request.data
+                if isinstance(rows, dict):
+                    rows = rows.get('users')
+                if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                    raise ValueError('Expected a list of user objects.')
+        except (UnicodeDecodeError, ValueError) as error:
+            raise ValidationError({'detail': [str(error)]})
+        if len(rows) > settings.PROVISION_MAX_USERS:
+            raise ValidationError({'detail': [f'At most {settings.PROVISION_MAX_USERS} users '
+                                              f'can be provisioned at once.']})
+        result = provision_users(
+            rows,
+            send_emails=request.query_params.get('email') not in ('0', 'false'),
+            issue_tokens=request.query_params.get('tokens') in ('1', 'true'))
+        return Response(result,
+                        status=(status.HTTP_201_CREATED if result['created']
+                                else status.HTTP_400_BAD_REQUEST))
+
+    @action(detail=False,
+            methods=('GET',),
+            permission_classes=(IsAuthenticated,),
+            url_path='me/history')
+    def history(self, request):
+        """
+        Per-quiz best, latest and average scores of the current user and
+        their trend per `?bucket=` day, week (default) or month.
+        """
+        bucket = request.query_params.get('bucket', 'week')
+        if bucket not in history.BUCKETS:
+            raise ValidationError({'bucket': [f'Must be one of {", ".join(history.BUCKETS)}.']})
+        return Response(HistorySerializer(history.get_history(request.user.pk, bucket)).data)
 
     @action(detail=False,
             methods=('GET', 'PATCH'),
@@ -105,21 +271,43 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class QuizViewSet(viewsets.ModelViewSet):
+class QuizViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Quiz model view set."""
     queryset = Quiz.objects.all()
     permission_classes = (AllowAny,)  # (IsStaffAdminOrReadOnly,)
     serializer_class = QuizSerializer
+    filter_backends = (FullTextSearchFilter,)
+    search_kind = 'quiz'
+    search_fallback_fields = ('title', 'questions__prompt', 'questions__answers__answer_text')
+
+    def is_search(self):
+        return bool(FullTextSearchFilter().get_search_query(self.request))
 
     @property
     def paginator(self):
         if getattr(self, '_paginator', None) is None:
-            if self.action == 'questions':
+            if self.action == 'questions' or self.action == 'list' and self.is_search():
                 self._paginator = super().paginator
             else:
                 self._paginator = None
         return self._paginator
 
+    def list(self, request, *args, **kwargs):
+        if self.is_search():
+            return super().list(request, *args, **kwargs)
+        # Hyperlinked questions depend on the host, so it is part of the key
+        key = api_cache.key('quizzes', 'list', request.build_absolute_uri('/'))
+        data = self.get_or_set_cached(
+            key, lambda: self.get_serializer(self.get_queryset(), many=True).data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        key = api_cache.key('quizzes', 'detail', kwargs['pk'],
+                            request.build_absolute_uri('/'))
+        data = self.get_or_set_cached(
+            key, lambda: self.get_serializer(self.get_object()).data)
+        return Response(data)
+
     @action(detail=True, methods=['get'])
     def questions(self, request, pk=None):
         quiz = self.get_object()
@@ -138,31 +326,69 @@ class QuizViewSet(viewsets.ModelViewSet):
     def sessions(self, request, pk=None):
         quiz = self.get_object()
         sessions = QuizSession.objects.filter(quiz=quiz)
-        serializer = QuizSessionSerializer(sessions, many=True)
-        return Response(serializer.data)
+        return Response(fastpath.session_rows(fastpath.session_values(sessions)))
 
     @action(detail=True, methods=['get'])
     def get_all_questions(self, request, pk=None):
         quiz = self.get_object()
         questions = Question.objects.filter(quiz=quiz)
-        serializer = QuestionSerializer(questions, many=True)
-        return Response(serializer.data)
+        return Response(fastpath.question_rows(questions))
 
+    @action(detail=True, methods=['get'])
+    def leaderboard(self, request, pk=None):
+        """Top sessions of the quiz and the caller's own rank and percentile."""
+        quiz = self.get_object()
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        limit = min(max(limit, 1), settings.LEADERBOARD_MAX_LIMIT)
+        standing = (leaderboard.user_standing(quiz.pk, request.user)
+                    if request.user.is_authenticated else None)
+        return Response({'top': leaderboard.top_sessions(quiz.pk, limit),
+                         'me': standing})
+
+    @action(detail=True, methods=['get'], permission_classes=(IsStaffOrAdmin,))
+    def analytics(self, request, pk=None):
+        """Per-question correct rates and answer distribution of the quiz."""
+        quiz = self.get_object()
+        return Response(analytics.quiz_report(quiz))
 
-class QuestionViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'], permission_classes=(IsStaffOrAdmin,))
+    def regrade(self, request, pk=None):
+        """
+        Rescores the completed sessions of the quiz against its current
+        answer key, `?dry_run=1` only reports the scores that would change.
+        """
+        quiz = self.get_object()
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+        sessions, changes = regrade.regrade_quiz(quiz.pk, dry_run=dry_run)
+        return Response({'dry_run': dry_run,
+                         'sessions': sessions,
+                         'changed': len(changes),
+                         'changes': [{'session': session_id,
+                                      'old_score': old_score,
+                                      'new_score': new_score}
+                                     for session_id, old_score, new_score
+                                     in changes[:settings.REGRADE_MAX_CHANGES_SHOWN]]})
+
+
+class QuestionViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Question model view set."""
     queryset = Question.objects.all()
     permission_classes = (AllowAny,)  # (IsStaffAdminOrReadOnly,)
     serializer_class = QuestionSerializer
+    filter_backends = (FullTextSearchFilter,)
+    search_kind = 'question'
+    search_fallback_fields = ('prompt', 'answers__answer_text')
 
     @action(detail=True, methods=['get'])
     def answers(self, request, pk=None):
         answers = Answer.objects.filter(question_id=pk)
-        serializer = AnswerSerializer(answers, many=True)
-        return Response(serializer.data)
+        return Response(fastpath.answer_rows(answers))
 
 
-class AnswerViewSet(viewsets.ModelViewSet):
+class AnswerViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Answer model view set."""
     queryset = Answer.objects.all()
     permission_classes = (AllowAny,)  # (IsStaffAdminOrReadOnly,)
@@ -172,6 +398,9 @@ class AnswerViewSet(viewsets.ModelViewSet):
     def paginator(self):
         self._paginator = None
 
+    def list(self, request, *args, **kwargs):
+        return Response(fastpath.answer_rows(self.filter_queryset(self.get_queryset())))
+
 
 class QuizSessionViewSet(viewsets.ModelViewSet):
     """QuizSession model view set."""
@@ -190,6 +419,13 @@ class QuizSessionViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(user=user)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        values = fastpath.session_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(values)
+        if page is not None:
+            return self.get_paginated_response(fastpath.session_rows(page))
+        return Response(fastpath.session_rows(values))
+
     def perform_create(self, serializer):
         """
         Sets the user associated with the session to the current logged-in user.
@@ -198,6 +434,42 @@ class QuizSessionViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("User must be authenticated to create a session.")
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    @unbatchable
+    def sync(self, request):
+        """
+        Imports completed offline attempts from an NDJSON body, one attempt
+        per line, and streams one NDJSON result line per attempt.
+        """
+        return StreamingHttpResponse(sync_attempts(request._request, request.user),
+                                     content_type='application/x-ndjson')
+
+    @action(detail=True, methods=['get', 'put'])
+    def answers(self, request, pk=None):
+        """
+        Buffered in-progress answers of the session. PUT replaces the answers
+        to one question; they are written as responses on completion.
+        """
+        session = self.get_object()
+        if request.method == 'PUT':
+            if session.is_completed:
+                raise ValidationError(detail='This session is already completed.')
+            serializer = AnswerUpsertSerializer(data=request.data, context={'session': session})
+            serializer.is_valid(raise_exception=True)
+            try:
+                answers = answer_buffer.upsert(session.pk,
+                                               serializer.validated_data['question'],
+                                               serializer.validated_data['selected_answers'])
+            except answer_buffer.BufferBusy:
+                return Response({'detail': 'The session answers are being changed, retry.'},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                headers={'Retry-After': '1'})
+        else:
+            answers = answer_buffer.get_answers(session.pk)
+        return Response({'session': session.pk,
+                         'answers': [{'question': question_id, 'selected_answers': answer_ids}
+                                     for question_id, answer_ids in answers.items()]})
+
     @action(detail=True, methods=['post'])
     def calculate_score(self, request, pk=None):
         """
@@ -212,6 +484,10 @@ class QuizSessionViewSet(viewsets.ModelViewSet):
         except QuizSession is None:
             return Response({'error': 'Quiz session not found'}, status=status.HTTP_404_NOT_FOUND)"""
             return Response({'status': 'score calculated'}, status=status.HTTP_200_OK)
+        except answer_buffer.BufferBusy:
+            return Response({'error': 'The session answers are being changed, retry.'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={'Retry-After': '1'})
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -241,14 +517,93 @@ class ResponseViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
+def _events_user(request, quiz_id):
+    """
+    Returns the user allowed to watch the quiz events, or None.
+
+    EventSource cannot send headers, so the access token may also be
+    given as the `token` query parameter.
+    """
+    authentication = JWTAuthentication()
+    try:
+        raw_token = request.GET.get('token')
+        if raw_token:
+            user = authentication.get_user(authentication.get_validated_token(raw_token))
+        else:
+            user = (authentication.authenticate(request) or (None, None))[0]
+    except (InvalidToken, TokenError):
+        return None
+    if user is None:
+        return None
+    if user.is_admin_or_superuser:
+        return user
+    if Quiz.objects.filter(pk=quiz_id, author=user).exists():
+        return user
+    return None
+
+
+async def quiz_events(request, quiz_id):
+    """
+    Streams completions and score updates of the quiz sessions as
+    Server-Sent Events, for staff and the quiz author.
+
+    Events are published in-process, so this view must be served by the
+    ASGI application in the process that handles the quiz sessions. Under
+    WSGI the endless stream would hold a worker and never see an event, so
+    it is refused there.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Live events are only served by a single ASGI process.'},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Method not allowed.'},
+                            status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    if not await sync_to_async(Quiz.objects.filter(pk=quiz_id).exists)():
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if await sync_to_async(_events_user)(request, quiz_id) is None:
+        return JsonResponse({'detail': 'You do not have permission to perform this action.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+    subscriber = broker.subscribe(quiz_id)
+    _, queue = subscriber
+
+    async def stream():
+        try:
+            yield f'retry: {settings.EVENTS_HEARTBEAT_SECONDS * 1000}\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(),
+                                                   settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing the idle connection
+                    yield ': heartbeat\n\n'
+                    continue
+                yield f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+        finally:
+            broker.unsubscribe(quiz_id, subscriber)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class QuizListView(APIView):
     """Lists all available quizzes for regular users."""
     def get(self, request, *args, **kwargs):
-        response = requests.get(f'{settings.API_BASE_URL}quizzes/')
-        if response.status_code == status.HTTP_200_OK:
-            quizzes = response.json()
-            return render(request, 'quiz/quiz_list.html', {'quizzes': quizzes})
-        return Response({'detail': 'Unable to retrieve quizzes.'}, status=response.status_code)
+        def render_quiz_list():
+            response = requests.get(f'{settings.API_BASE_URL}quizzes/')
+            response.raise_for_status()
+            return render_to_string('quiz/quiz_list.html', {'quizzes': response.json()})
+
+        # The page only depends on quiz content, so it is cached by its version
+        try:
+            page = api_cache.get_or_set(api_cache.key('quizzes', 'page', 'list'),
+                                        render_quiz_list)
+        except requests.HTTPError as error:
+            return Response({'detail': 'Unable to retrieve quizzes.'},
+                            status=error.response.status_code)
+        return HttpResponse(page)
 
 
 class TakeQuizView(APIView):
@@ -256,9 +611,10 @@ class TakeQuizView(APIView):
     permission_classes = (AllowAny,)
 
     def get(self, request, quiz_id):
-        # Fetch the quiz details
-        response = requests.get(f'{settings.API_BASE_URL}quizzes/{quiz_id}/')
-        if response.status_code == status.HTTP_200_OK:
+        def render_questions():
+            # Fetch the quiz details
+            response = requests.get(f'{settings.API_BASE_URL}quizzes/{quiz_id}/')
+            response.raise_for_status()
             quiz = response.json()
             # Fetch the details of each question
             questions = []
@@ -268,10 +624,20 @@ class TakeQuizView(APIView):
                     question = question_response.json()
                     questions.append(question)
 
-            quiz['questions'] = questions  # Replace URLs with question details
-            return render(request, 'quiz/take_quiz.html', {'quiz': quiz})
+            return {'id': quiz['id'],
+                    'title': quiz['title'],
+                    'questions_html': render_to_string('quiz/take_quiz_questions.html',
+                                                       {'questions': questions})}
 
-        return redirect('quiz_list')
+        # The question fragment is cached by quiz content version, the form
+        # around it is rendered per request because it carries the CSRF token
+        try:
+            quiz = api_cache.get_or_set(api_cache.key('quizzes', 'page', 'take', quiz_id),
+                                        render_questions)
+        except requests.HTTPError:
+            return redirect('quiz_list')
+        return render(request, 'quiz/take_quiz.html',
+                      {'quiz': quiz, 'questions_html': quiz['questions_html']})
 
     def post(self, request, quiz_id):
         # Collecting quiz taker responses from the form
@@ -316,28 +682,29 @@ class TakeQuizView(APIView):
             return Response({'errors': ['Failed to calculate score']}, status=status.HTTP_400_BAD_REQUEST)
 
         if not response_errors:
+            # The session belongs to the JWT_TOKEN user, let this browser see its result
+            taken = request.session.get(TAKEN_SESSIONS_KEY, [])
+            request.session[TAKEN_SESSIONS_KEY] = [*taken, session_id][-TAKEN_SESSIONS_LIMIT:]
             print(f"Redirecting to quiz_result with session_id: {session_id}")
             return redirect('quiz_result', session_id=session_id)
         return Response({'errors': response_errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class QuizResultView(APIView):
-    """Displays the results of a completed quiz session."""
+    """
+    Displays the results of a completed quiz session to its user, to staff
+    and to the browser that took it through TakeQuizView.
+    """
+    authentication_classes = (JWTAuthentication, SessionAuthentication)
     permission_classes = (AllowAny,)
 
     def get(self, request, session_id):
-        headers = {
-            'Authorization': f'{os.getenv("JWT_TOKEN")}'
-            # Adjust according to your authentication scheme
-        }
-        response = requests.get(f'{settings.API_BASE_URL}sessions/{session_id}/', headers=headers)
-        session = response.json()
-        quiz_response = requests.get(f'{settings.API_BASE_URL}quizzes/{session["quiz"]}/', headers=headers)
-        quiz = quiz_response.json()
-        if response.status_code == status.HTTP_200_OK:
-            session_data = response.json()
-            print(session_data)
-            return render(request,
-                          'quiz/quiz_result.html',
-                          {'session': session_data, 'quiz': quiz})
-        return redirect('quiz_list')
+        session = QuizSession.objects.filter(pk=session_id).first()
+        if session is None or not session.is_completed:
+            return redirect('quiz_list')
+        if (session.user_id != request.user.pk and not request.user.is_staff
+                and session.pk not in request.session.get(TAKEN_SESSIONS_KEY, [])):
+            raise Http404
+        return render(request,
+                      'quiz/quiz_result.html',
+                      {'session': session, 'result': session.get_result()})
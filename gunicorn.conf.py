@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for production serving.
+
+Every setting can be overridden through the environment, see README.md.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'oper.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+# Time in-flight requests get to finish on reload or shutdown
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+# Load Django once in the master and share the imported code with the workers
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+pidfile = os.getenv('GUNICORN_PIDFILE', '/tmp/gunicorn.pid')
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Drops database connections inherited from the master."""
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+
+
+def post_worker_init(worker):
+    """Warms up the worker before it starts accepting connections."""
+    from oper.warmup import warm_up
+
+    try:
+        warm_up()
+    except Exception:
+        worker.log.exception('Worker warm-up failed')
+
+
+def worker_exit(server, worker):
+    """Writes buffered quiz counters before the worker goes away."""
+    from quiz.counters import counters
+
+    counters.flush()
@@ -0,0 +1,104 @@
+"""
+Read replica routing.
+
+Reads go to a replica only inside replica_reads(), which the API viewsets
+and admin views enter for safe requests. Users that wrote recently are
+pinned to the primary for REPLICA_PIN_SECONDS so they read their writes.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def enable_replica_reads():
+    """Routes reads of the current context to replicas, returns a reset token."""
+    return _replica_reads.set(True)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def reads_from_replica():
+    """Whether reads of the current context go to a replica."""
+    return _replica_reads.get() and bool(settings.REPLICA_DATABASES)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _pin_key(user):
+    return f'replica-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Sends the user's reads to the primary for a while after a write."""
+    if user.is_authenticated:
+        caches['shared'].set(_pin_key(user), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and caches['shared'].get(_pin_key(user)) is not None
+
+
+class ReplicaRouter:
+    """Sends reads inside replica_reads() to a random replica, everything else to default."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.REPLICA_DATABASES:
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadAdminMixin:
+    """Serves admin list and change pages from a replica and pins the user after edits."""
+
+    def _render_from_replica(self, request, view, *args, **kwargs):
+        with replica_reads(request.method == 'GET' and not is_pinned(request.user)):
+            response = view(request, *args, **kwargs)
+            # Admin responses query lazily while rendering
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+    def changelist_view(self, request, extra_context=None):
+        return self._render_from_replica(request, super().changelist_view,
+                                         extra_context=extra_context)
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        return self._render_from_replica(request, super().change_view, object_id,
+                                         form_url=form_url, extra_context=extra_context)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        pin_to_primary(request.user)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        pin_to_primary(request.user)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        pin_to_primary(request.user)
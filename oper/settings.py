@@ -69,6 +69,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.SamplingProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'oper.urls'
@@ -77,8 +78,13 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -102,6 +108,22 @@ DATABASES = {
     }
 }
 
+# Read replicas, given as comma-separated SQLite files for local testing,
+# see `python manage.py sync_sqlite_replicas`
+REPLICA_DATABASES = []
+for index, replica_path in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(','))):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': replica_path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['oper.db_router.ReplicaRouter']
+# Seconds a user reads from the primary after writing
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -154,6 +176,32 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 API_BASE_URL = 'http://127.0.0.1:8000/api/'
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Two-tier API cache: per-process LRU in front of CACHES['shared']
+API_CACHE = {
+    'ALIAS': 'shared',
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 30,
+    'VERSION_TTL': 1,
+    'DEFAULT_TTL': 300,
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 2,
+}
+
 print(os.getenv("DATABASE_URL"))
 
 # CONSTANTS:
@@ -161,3 +209,55 @@ MAX_USERNAME_LENGTH = 150
 MAX_EMAIL_LENGTH = 254
 MAX_ROLE_LENGTH = 50
 FROM_EMAIL = 'quiz@mail.com'
+SEARCH_MAX_RESULTS = 200
+# Read-only paths requested by every production worker before it serves traffic
+WARMUP_PATHS = ['/api/quizzes/']
+QUIZ_COUNTER_FLUSH_INTERVAL = 5
+LEADERBOARD_HISTOGRAM_TTL = 600
+LEADERBOARD_MAX_LIMIT = 100
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+# Buffered in-progress answers, one file per session, see session/answer_buffer.py.
+# Kept out of CACHES['shared'], whose culling and clear() would drop answers.
+ANSWER_BUFFER_DIR = os.path.join(BASE_DIR, 'answer_buffer')
+# Seconds a request waits for the buffer of a session before it fails
+ANSWER_BUFFER_LOCK_WAIT = 2
+# Seconds of inactivity after which buffered answers are written to the database
+ANSWER_BUFFER_TIMEOUT = 1800
+# Server-Sent Events of quiz sessions
+EVENTS_QUEUE_SIZE = 100
+EVENTS_HEARTBEAT_SECONDS = 15
+# Bulk user provisioning
+PROVISION_MAX_USERS = 10000
+PROVISION_BATCH_SIZE = 1000
+PROVISION_EMAIL_BATCH_SIZE = 500
+
+# Sampling profiler of slow requests, see api/profiling.py
+PROFILER = {
+    'ENABLED': os.getenv('PROFILER_ENABLED') == '1',
+    'VIEWS': ['TakeQuizView', 'QuizSessionViewSet'],
+    'THRESHOLD_MS': int(os.getenv('PROFILER_THRESHOLD_MS', 500)),
+    'SAMPLE_RATE': float(os.getenv('PROFILER_SAMPLE_RATE', 0)),
+    'INTERVAL_MS': 5,
+    'HEADER': 'X-Profile',
+    'HEADER_MAX_AGE': 3600,
+    'DIRECTORY': os.path.join(BASE_DIR, 'profiles'),
+    'MAX_FILES': 200,
+}
+
+# Slow query log, see api/querylog.py
+QUERY_LOG = {
+    'ENABLED': os.getenv('QUERY_LOG_ENABLED') == '1',
+    'THRESHOLD_MS': float(os.getenv('QUERY_LOG_THRESHOLD_MS', 100)),
+    'FILE': os.path.join(BASE_DIR, 'slow_queries.json'),
+    'FLUSH_INTERVAL': 10,
+}
+# Sessions rescored per UPDATE when an answer key changes
+REGRADE_BATCH_SIZE = 5000
+REGRADE_MAX_CHANGES_SHOWN = 100
+# Offline attempt sync, attempts imported per transaction
+SYNC_CHUNK_SIZE = 500
+SYNC_MAX_LINE_BYTES = 65536
+# Per-user score history
+HISTORY_TREND_PERIODS = 52
+HISTORY_CACHE_TTL = 3600
@@ -0,0 +1,55 @@
+"""
+Worker warm-up for the production server.
+
+Runs in every freshly forked worker before it accepts traffic: opens the
+database connections and replays a few read requests through the WSGI
+application, so the first real requests hit warm caches.
+"""
+
+import io
+import logging
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def open_connections():
+    """Opens a connection to every configured database."""
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def prime_paths(application, paths):
+    """Issues in-process GET requests so their responses get cached."""
+    # Use the host the frontend views call the API with, cached pages
+    # contain absolute URLs built from it
+    base_url = urlsplit(settings.API_BASE_URL)
+    for path in paths:
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'SERVER_NAME': base_url.hostname,
+            'SERVER_PORT': str(base_url.port or 80),
+            'HTTP_HOST': base_url.netloc,
+            'wsgi.url_scheme': base_url.scheme,
+            'wsgi.input': io.BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+        body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b''.join(body)
+        if hasattr(body, 'close'):
+            body.close()
+        logger.info('Warm-up GET %s: %s', path, statuses[0] if statuses else 'no response')
+
+
+def warm_up():
+    """Primes database connections and API caches of the current process."""
+    from oper.wsgi import application
+
+    open_connections()
+    prime_paths(application, settings.WARMUP_PATHS)
@@ -1,13 +1,14 @@
 from django.contrib import admin
 from django.db.models import Q
 
+from oper.db_router import ReplicaReadAdminMixin
 from quiz.models import Answer, Question, Quiz
 
 
 @admin.register(Quiz)
-class QuizAdmin(admin.ModelAdmin):
+class QuizAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """Handles the Quiz model in the admin panel"""
-    list_display = ['id', 'title', 'author', 'created_at']
+    list_display = ['id', 'title', 'author', 'sample_size', 'created_at']
     list_filter = ['author']
     search_fields = ['author', 'title']
 
@@ -38,7 +39,7 @@ class QuizQuestionFilter(admin.SimpleListFilter):
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """Handles the Question model in the admin panel"""
     fields = ['prompt', 'quiz']
     list_display = ['id', 'prompt', 'quiz']
@@ -68,7 +69,7 @@ class AnswerQuestionFilter(admin.SimpleListFilter):
 
 
 @admin.register(Answer)
-class AnswerAdmin(admin.ModelAdmin):
+class AnswerAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """Handles the Answer model in the admin panel"""
     list_display = ['id', 'answer_text', 'is_correct', 'question']
     list_filter = [AnswerQuestionFilter]
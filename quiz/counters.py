@@ -0,0 +1,86 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from api.cache import api_cache
+from quiz.models import Quiz
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """
+    Buffers quiz popularity counter increments in process memory and
+    applies them with one atomic F() update per quiz every
+    `flush_interval` seconds from a background thread, so completions of a
+    popular quiz do not queue up on its row lock. Stored counters lag by
+    about the interval, and by more only while the database is failing.
+    """
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _accumulate(self, quiz_id, times_taken, completions, score_sum):
+        deltas = self._pending.setdefault(quiz_id, [0, 0, 0.0])
+        deltas[0] += times_taken
+        deltas[1] += completions
+        deltas[2] += score_sum
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='quiz-counters', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            # The thread keeps its own connection, don't hold it between flushes
+            connection.close()
+
+    def add(self, quiz_id, times_taken=0, completions=0, score_sum=0.0):
+        with self._lock:
+            self._accumulate(quiz_id, times_taken, completions, score_sum)
+            self._ensure_thread()
+
+    def flush(self):
+        """
+        Writes the buffered increments to the database and drops cached quiz
+        reads if any counter changed. Failures are logged, not raised, since
+        the completions they count are already committed.
+        """
+        with self._lock:
+            pending, self._pending = list(self._pending.items()), {}
+        updated = 0
+        for index, (quiz_id, (times_taken, completions, score_sum)) in enumerate(pending):
+            try:
+                updated += Quiz.objects.filter(pk=quiz_id).update(
+                    times_taken=F('times_taken') + times_taken,
+                    completions=F('completions') + completions,
+                    score_sum=F('score_sum') + score_sum)
+            except Exception:
+                logger.exception('Writing quiz counters failed, retrying on the next flush')
+                # Keep the unwritten increments for the next flush
+                with self._lock:
+                    for quiz_id, deltas in pending[index:]:
+                        self._accumulate(quiz_id, *deltas)
+                break
+        if updated:
+            # Quiz reads are cached with their counters
+            api_cache.bump('quizzes')
+
+
+counters = CounterBuffer(settings.QUIZ_COUNTER_FLUSH_INTERVAL)
+atexit.register(counters.flush)
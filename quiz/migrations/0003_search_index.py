@@ -0,0 +1,113 @@
+from django.db import migrations
+
+# Full-text index over quiz titles, question prompts and answer texts.
+# Rows are keyed by rowid = object id * 4 + kind, so the sync triggers
+# touch a single row by primary key instead of scanning the index.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE quiz_search USING fts5(
+        body,
+        quiz_id UNINDEXED,
+        question_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO quiz_search (rowid, body, quiz_id, question_id)
+    SELECT id * 4 + 1, title, id, NULL FROM quiz_quiz
+    """,
+    """
+    INSERT INTO quiz_search (rowid, body, quiz_id, question_id)
+    SELECT id * 4 + 2, prompt, quiz_id, id FROM quiz_question
+    """,
+    """
+    INSERT INTO quiz_search (rowid, body, quiz_id, question_id)
+    SELECT a.id * 4 + 3, a.answer_text, q.quiz_id, a.question_id
+    FROM quiz_answer a JOIN quiz_question q ON q.id = a.question_id
+    """,
+    """
+    CREATE TRIGGER quiz_search_quiz_ai AFTER INSERT ON quiz_quiz BEGIN
+        INSERT INTO quiz_search (rowid, body, quiz_id, question_id)
+        VALUES (new.id * 4 + 1, new.title, new.id, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_quiz_au AFTER UPDATE OF title ON quiz_quiz BEGIN
+        UPDATE quiz_search SET body = new.title WHERE rowid = new.id * 4 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_quiz_ad AFTER DELETE ON quiz_quiz BEGIN
+        DELETE FROM quiz_search WHERE rowid = old.id * 4 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_question_ai AFTER INSERT ON quiz_question BEGIN
+        INSERT INTO quiz_search (rowid, body, quiz_id, question_id)
+        VALUES (new.id * 4 + 2, new.prompt, new.quiz_id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_question_au AFTER UPDATE OF prompt, quiz_id ON quiz_question BEGIN
+        UPDATE quiz_search SET body = new.prompt, quiz_id = new.quiz_id
+        WHERE rowid = new.id * 4 + 2;
+        UPDATE quiz_search SET quiz_id = new.quiz_id
+        WHERE rowid IN (SELECT id * 4 + 3 FROM quiz_answer WHERE question_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_question_ad AFTER DELETE ON quiz_question BEGIN
+        DELETE FROM quiz_search WHERE rowid = old.id * 4 + 2;
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_answer_ai AFTER INSERT ON quiz_answer BEGIN
+        INSERT INTO quiz_search (rowid, body, quiz_id, question_id)
+        VALUES (new.id * 4 + 3, new.answer_text,
+                (SELECT quiz_id FROM quiz_question WHERE id = new.question_id),
+                new.question_id);
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_answer_au AFTER UPDATE OF answer_text, question_id ON quiz_answer BEGIN
+        UPDATE quiz_search
+        SET body = new.answer_text,
+            quiz_id = (SELECT quiz_id FROM quiz_question WHERE id = new.question_id),
+            question_id = new.question_id
+        WHERE rowid = new.id * 4 + 3;
+    END
+    """,
+    """
+    CREATE TRIGGER quiz_search_answer_ad AFTER DELETE ON quiz_answer BEGIN
+        DELETE FROM quiz_search WHERE rowid = old.id * 4 + 3;
+    END
+    """,
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS quiz_search_{table}_{event}'
+    for table in ('quiz', 'question', 'answer')
+    for event in ('ai', 'au', 'ad')
+] + ['DROP TABLE IF EXISTS quiz_search']
+
+
+def run_sql(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite-only, other backends fall back to LIKE queries
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
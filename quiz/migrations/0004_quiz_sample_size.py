@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:49
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='sample_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Number of random questions drawn for each attempt. Leave empty to use all questions.', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_quiz_sample_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='completions',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='score_sum',
+            field=models.FloatField(default=0, editable=False),
+        ),
+    ]
@@ -1,14 +1,31 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 
 from users.models import User
 
+COUNTER_FIELDS = ('times_taken', 'completions', 'score_sum')
+
 
 class Quiz(models.Model):
     """Quiz model"""
     author = models.ForeignKey(User, on_delete=models.DO_NOTHING, default=None)
     title = models.CharField(max_length=255, default='')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Popularity counters, only ever changed through quiz.counters
     times_taken = models.IntegerField(default=0, editable=False)
+    completions = models.IntegerField(default=0, editable=False)
+    score_sum = models.FloatField(default=0, editable=False)
+    sample_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        help_text='Number of random questions drawn for each attempt. Leave empty to use all questions.',
+    )
+
+    @property
+    def average_score(self):
+        """Returns the average score of completed sessions"""
+        return self.score_sum / self.completions if self.completions else None
 
     @property
     def question_count(self):
@@ -19,6 +36,13 @@ class Quiz(models.Model):
         verbose_name_plural = "Quizzes"
         ordering = ['id']
 
+    def save(self, *args, **kwargs):
+        """Saves the quiz without overwriting the concurrently updated counters"""
+        if not self._state.adding and not kwargs.get('update_fields') and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in COUNTER_FIELDS]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
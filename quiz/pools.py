@@ -0,0 +1,24 @@
+import random
+
+from api.cache import api_cache
+from quiz.models import Question
+
+
+def get_question_ids(quiz_id):
+    """Returns the cached array of question ids of the quiz."""
+    return api_cache.get_or_set(
+        api_cache.key('quizzes', 'question-ids', quiz_id),
+        lambda: list(Question.objects.filter(quiz_id=quiz_id).values_list('id', flat=True)))
+
+
+def draw_question_ids(quiz):
+    """
+    Draws `quiz.sample_size` random question ids in shuffled order, or
+    returns None if the quiz has no sample size and every attempt uses
+    all of its questions. random.sample() picks from the cached id array
+    in O(sample size) for pools much larger than the sample.
+    """
+    if quiz.sample_size is None:
+        return None
+    question_ids = get_question_ids(quiz.pk)
+    return random.sample(question_ids, min(quiz.sample_size, len(question_ids)))
@@ -0,0 +1,51 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+
+QUIZ = 'quiz'
+QUESTION = 'question'
+
+# Documents of these kinds are grouped into results of the given kind
+GROUP_COLUMNS = {
+    QUIZ: 'quiz_id',
+    QUESTION: 'question_id',
+}
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def is_supported():
+    """Checks if the full-text index is available on the database."""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_expression(query):
+    """
+    Turns free user input into an FTS5 expression matching every word
+    as a prefix, so FTS5 operators in the input are never interpreted.
+    """
+    tokens = TOKEN_PATTERN.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_ids(kind, query, limit=None):
+    """
+    Returns ids of quizzes or questions matching the query, best first.
+
+    A quiz matches through its title, question prompts and answer texts,
+    a question through its prompt and answer texts. Results are ranked by
+    the best BM25 rank among the matching documents.
+    """
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+    column = GROUP_COLUMNS[kind]
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {column}, MIN(rank) AS best FROM quiz_search '
+            f'WHERE quiz_search MATCH %s AND {column} IS NOT NULL '
+            f'GROUP BY {column} ORDER BY best LIMIT %s',
+            [expression, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
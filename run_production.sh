@@ -0,0 +1,63 @@
+#!/usr/bin/env bash
+# Usage: run_production.sh [start|reload]
+#   start  - applies migrations and serves the app with gunicorn
+#   reload - gracefully replaces the running workers with freshly loaded code
+
+PIDFILE="${GUNICORN_PIDFILE:-/tmp/gunicorn.pid}"
+
+master_alive() {
+  # The new master of a reload writes $PIDFILE.2 until the old one exits
+  for file in "$PIDFILE" "$PIDFILE.2"; do
+    pid="$(cat "$file" 2>/dev/null)" && kill -0 "$pid" 2>/dev/null && return 0
+  done
+  return 1
+}
+
+case "${1:-start}" in
+  start)
+    python manage.py migrate --noinput
+    python manage.py collectstatic --noinput
+    gunicorn -c gunicorn.conf.py &
+    first_pid=$!
+    # Forward stop signals to whichever master currently serves
+    trap 'kill -TERM "$(cat "$PIDFILE" 2>/dev/null || echo "$first_pid")" 2>/dev/null' TERM INT
+    # A preload reload hands the service to a new master that is not our
+    # child, so stay up while any master owns the pid file. Under tini the
+    # orphaned new master is reaped by PID 1.
+    while kill -0 "$first_pid" 2>/dev/null || master_alive; do
+      sleep 1 & wait $!
+    done
+    ;;
+  reload)
+    old_pid="$(cat "$PIDFILE")"
+    if [ "${GUNICORN_PRELOAD:-1}" = "1" ] && [ "$old_pid" = "1" ]; then
+      # Stopping the old master would stop the container, see README.md
+      echo "gunicorn runs as PID 1, start it with run_production.sh under tini" >&2
+      exit 1
+    fi
+    if [ "${GUNICORN_PRELOAD:-1}" != "1" ]; then
+      # Workers import the code themselves, HUP replaces them gracefully
+      kill -HUP "$old_pid"
+      exit 0
+    fi
+    # The code is preloaded in the master, so start a new master next to
+    # the old one and stop the old one only once the new one is up. The new
+    # master writes $PIDFILE.2 and takes over $PIDFILE when the old one exits.
+    # Old workers finish their in-flight requests within graceful_timeout.
+    kill -USR2 "$old_pid"
+    for _ in $(seq 1 60); do
+      if [ -s "$PIDFILE.2" ]; then
+        sleep "${RELOAD_WARMUP_SECONDS:-5}"
+        kill -TERM "$old_pid"
+        exit 0
+      fi
+      sleep 1
+    done
+    echo "New gunicorn master did not start, keeping $old_pid" >&2
+    exit 1
+    ;;
+  *)
+    echo "Usage: $0 [start|reload]" >&2
+    exit 1
+    ;;
+esac
@@ -1,10 +1,11 @@
 from django.contrib import admin
 
+from oper.db_router import ReplicaReadAdminMixin
 from session.models import QuizSession, Response
 
 
 @admin.register(QuizSession)
-class QuizSessionAdmin(admin.ModelAdmin):
+class QuizSessionAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """Handles the QuizSession model in the admin panel"""
     list_display = ['user', 'quiz', 'started_at', 'completed_at', 'score', 'is_completed',]
     list_filter = ['user', 'quiz', 'is_completed',]
@@ -16,7 +17,7 @@ class QuizSessionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Response)
-class ResponseAdmin(admin.ModelAdmin):
+class ResponseAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """Handles the Response model in the admin panel"""
     list_display = ['session', 'question', 'selected_answer',]
     list_filter = ['session__quiz',]
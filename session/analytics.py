@@ -0,0 +1,146 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from quiz.models import Answer, Question
+from session.models import AnswerStat, QuestionStat, QuizSession, Response
+from session.packing import unpack_ids
+
+PACKED_LOOKUP_BATCH = 500
+
+
+def record_responses(quiz_id, responses):
+    """
+    Adds the responses of a newly completed session to the rollups.
+    `responses` is an iterable of (question_id, answer_id, is_correct).
+    """
+    question_totals = Counter()
+    question_correct = Counter()
+    answer_totals = Counter()
+    answer_questions = {}
+    for question_id, answer_id, is_correct in responses:
+        question_totals[question_id] += 1
+        question_correct[question_id] += bool(is_correct)
+        answer_totals[answer_id] += 1
+        answer_questions[answer_id] = question_id
+    if not question_totals:
+        return
+
+    with transaction.atomic():
+        QuestionStat.objects.bulk_create(
+            [QuestionStat(question_id=question_id, quiz_id=quiz_id)
+             for question_id in question_totals],
+            ignore_conflicts=True)
+        AnswerStat.objects.bulk_create(
+            [AnswerStat(answer_id=answer_id, question_id=question_id, quiz_id=quiz_id)
+             for answer_id, question_id in answer_questions.items()],
+            ignore_conflicts=True)
+        for question_id, total in question_totals.items():
+            QuestionStat.objects.filter(question_id=question_id).update(
+                responses=F('responses') + total,
+                correct_responses=F('correct_responses') + question_correct[question_id])
+        for answer_id, total in answer_totals.items():
+            AnswerStat.objects.filter(answer_id=answer_id).update(
+                times_selected=F('times_selected') + total)
+
+
+def rebuild(quiz_id=None):
+    """
+    Recomputes the rollups from completed sessions, for one quiz or for
+    all of them: GROUP BY queries over Response rows plus a streaming pass
+    over packed answer vectors. Returns the number of question and answer
+    stat rows written.
+    """
+    responses = Response.objects.filter(session__is_completed=True)
+    packed = QuizSession.objects.filter(is_completed=True, answer_vector__isnull=False)
+    question_stats = QuestionStat.objects.all()
+    answer_stats = AnswerStat.objects.all()
+    if quiz_id is not None:
+        responses = responses.filter(session__quiz_id=quiz_id)
+        packed = packed.filter(quiz_id=quiz_id)
+        question_stats = question_stats.filter(quiz_id=quiz_id)
+        answer_stats = answer_stats.filter(quiz_id=quiz_id)
+
+    # question_id -> [quiz_id, responses, correct_responses]
+    questions = {}
+    # answer_id -> [question_id, quiz_id, times_selected]
+    answers = {}
+    question_rows = (responses
+                     .values('question_id', 'question__quiz_id')
+                     .annotate(total=Count('id'),
+                               correct=Count('id', filter=Q(selected_answer__is_correct=True)))
+                     .order_by())
+    for row in question_rows:
+        questions[row['question_id']] = [row['question__quiz_id'], row['total'], row['correct']]
+    answer_rows = (responses
+                   .values('selected_answer_id', 'question_id', 'question__quiz_id')
+                   .annotate(total=Count('id'))
+                   .order_by())
+    for row in answer_rows:
+        answers[row['selected_answer_id']] = [row['question_id'], row['question__quiz_id'],
+                                              row['total']]
+
+    packed_counts = Counter()
+    for vector in packed.values_list('answer_vector', flat=True).iterator(chunk_size=2000):
+        packed_counts.update(unpack_ids(vector))
+    answer_ids = list(packed_counts)
+    for start in range(0, len(answer_ids), PACKED_LOOKUP_BATCH):
+        batch = (Answer.objects.filter(pk__in=answer_ids[start:start + PACKED_LOOKUP_BATCH])
+                 .values_list('id', 'question_id', 'question__quiz_id', 'is_correct'))
+        for answer_id, question_id, answer_quiz_id, is_correct in batch:
+            times_selected = packed_counts[answer_id]
+            answers.setdefault(answer_id, [question_id, answer_quiz_id, 0])[2] += times_selected
+            question = questions.setdefault(question_id, [answer_quiz_id, 0, 0])
+            question[1] += times_selected
+            question[2] += times_selected if is_correct else 0
+
+    with transaction.atomic():
+        question_stats.delete()
+        answer_stats.delete()
+        created_questions = QuestionStat.objects.bulk_create(
+            [QuestionStat(question_id=question_id,
+                          quiz_id=question_quiz_id,
+                          responses=total,
+                          correct_responses=correct)
+             for question_id, (question_quiz_id, total, correct) in questions.items()],
+            batch_size=500)
+        created_answers = AnswerStat.objects.bulk_create(
+            [AnswerStat(answer_id=answer_id,
+                        question_id=question_id,
+                        quiz_id=answer_quiz_id,
+                        times_selected=total)
+             for answer_id, (question_id, answer_quiz_id, total) in answers.items()],
+            batch_size=500)
+    return len(created_questions), len(created_answers)
+
+
+def quiz_report(quiz):
+    """Builds per-question difficulty and answer distribution of the quiz."""
+    question_stats = {stat.question_id: stat
+                      for stat in QuestionStat.objects.filter(quiz=quiz)}
+    answer_stats = dict(AnswerStat.objects.filter(quiz=quiz)
+                        .values_list('answer_id', 'times_selected'))
+    report = []
+    for question in Question.objects.filter(quiz=quiz).prefetch_related('answers'):
+        stat = question_stats.get(question.pk)
+        responses = stat.responses if stat else 0
+        answers = []
+        for answer in question.answers.all():
+            times_selected = answer_stats.get(answer.pk, 0)
+            answers.append({
+                'id': answer.pk,
+                'answer_text': answer.answer_text,
+                'is_correct': answer.is_correct,
+                'times_selected': times_selected,
+                'selection_rate': times_selected / responses if responses else None,
+            })
+        report.append({
+            'id': question.pk,
+            'prompt': question.prompt,
+            'responses': responses,
+            'correct_responses': stat.correct_responses if stat else 0,
+            'correct_rate': stat.correct_rate if stat else None,
+            'answers': answers,
+        })
+    return report
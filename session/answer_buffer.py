@@ -0,0 +1,150 @@
+"""
+Buffered in-progress answers of quiz sessions.
+
+Every session with buffered answers has one JSON file in
+ANSWER_BUFFER_DIR, replaced atomically on each change, so its mtime tells
+when the session was last active. Changes to a session's file happen
+under an exclusive fcntl lock on one of LOCK_STRIPES lock files, which
+serializes concurrent PUTs and flushes across processes.
+"""
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from session.models import Response
+
+LOCK_STRIPES = 256
+LOCK_POLL_INTERVAL = 0.01
+BUFFER_SUFFIX = '.json'
+
+
+class BufferBusy(Exception):
+    """The buffer of a session stayed locked for ANSWER_BUFFER_LOCK_WAIT seconds."""
+
+
+def _path(session_id):
+    return os.path.join(settings.ANSWER_BUFFER_DIR, f'{int(session_id)}{BUFFER_SUFFIX}')
+
+
+@contextmanager
+def _locked(session_id):
+    """Holds the lock of a session's buffer, raises BufferBusy if it can't be taken in time."""
+    directory = os.path.join(settings.ANSWER_BUFFER_DIR, 'locks')
+    os.makedirs(directory, exist_ok=True)
+    # Lock files are never deleted, unlinking one while it is waited on would break the lock
+    fd = os.open(os.path.join(directory, f'{int(session_id) % LOCK_STRIPES}.lock'),
+                 os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + settings.ANSWER_BUFFER_LOCK_WAIT
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise BufferBusy(session_id)
+                time.sleep(LOCK_POLL_INTERVAL)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+def _read(session_id):
+    try:
+        with open(_path(session_id)) as file:
+            answers = json.load(file)
+    except FileNotFoundError:
+        return {}
+    return {int(question_id): answer_ids for question_id, answer_ids in answers.items()}
+
+
+def _write(session_id, answers):
+    path = _path(session_id)
+    if not answers:
+        _remove(path)
+        return
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(answers, file)
+    os.replace(temporary, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_answers(session_id):
+    """Returns the buffered {question_id: [answer_id, ...]} of a session."""
+    return _read(session_id)
+
+
+def upsert(session_id, question_id, answer_ids):
+    """
+    Replaces the buffered answers to one question, an empty list clears them.
+    Raises BufferBusy when the buffer stays locked by another request.
+    """
+    with _locked(session_id):
+        answers = _read(session_id)
+        if answer_ids:
+            answers[question_id] = sorted(set(answer_ids))
+        else:
+            answers.pop(question_id, None)
+        _write(session_id, answers)
+    return answers
+
+
+def flush(session):
+    """
+    Writes the buffered answers of a session as Response rows with a single
+    bulk_create, replacing stored responses to the same questions. Must not
+    run inside an outer transaction, the buffer is dropped after commit.
+    Raises BufferBusy when the buffer stays locked by another request.
+    """
+    with _locked(session.pk):
+        answers = _read(session.pk)
+        if not answers:
+            return 0
+        with transaction.atomic():
+            Response.objects.filter(session=session, question_id__in=list(answers)).delete()
+            created = Response.objects.bulk_create(
+                [Response(session=session, question_id=question_id, selected_answer_id=answer_id)
+                 for question_id, answer_ids in answers.items()
+                 for answer_id in answer_ids])
+        _remove(_path(session.pk))
+    return len(created)
+
+
+def discard(session_id):
+    """Drops the buffered answers of a session without writing them."""
+    with _locked(session_id):
+        _remove(_path(session_id))
+
+
+def stale_session_ids(timeout):
+    """Returns ids of sessions whose buffer was not changed for `timeout` seconds."""
+    cutoff = time.time() - timeout
+    try:
+        entries = list(os.scandir(settings.ANSWER_BUFFER_DIR))
+    except FileNotFoundError:
+        return []
+    session_ids = []
+    for entry in entries:
+        name = entry.name[:-len(BUFFER_SUFFIX)]
+        if not entry.name.endswith(BUFFER_SUFFIX) or not name.isdigit():
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                session_ids.append(int(name))
+        except FileNotFoundError:
+            # Flushed since the directory was listed
+            continue
+    return session_ids
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from api.cache import api_cache
+from session.models import QuizSession
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+# Bumped when scores of many users change at once, e.g. by a regrade
+GLOBAL_NAMESPACE = 'history'
+
+
+def user_namespace(user_id):
+    return f'history:{user_id}'
+
+
+def invalidate(user_id):
+    """Drops the cached history of a user after one of their sessions completed."""
+    api_cache.bump(user_namespace(user_id))
+
+
+def invalidate_all():
+    api_cache.bump(GLOBAL_NAMESPACE)
+
+
+def completed_sessions(user_id):
+    return QuizSession.objects.filter(user_id=user_id, is_completed=True)
+
+
+def build_history(user_id, bucket):
+    """
+    Aggregates the completed sessions of a user per quiz and per period.
+
+    Both GROUP BY queries filter on user and completion, which the
+    session_user_history_idx partial index covers.
+    """
+    latest_score = (completed_sessions(user_id)
+                    .filter(quiz_id=OuterRef('quiz_id'))
+                    .order_by('-completed_at', '-id')
+                    .values('score')[:1])
+    quizzes = list(completed_sessions(user_id)
+                   .values('quiz_id')
+                   .annotate(quiz_title=Max('quiz__title'),
+                             attempts=Count('id'),
+                             best_score=Max('score'),
+                             average_score=Avg('score'),
+                             latest_score=Subquery(latest_score),
+                             first_completed_at=Min('completed_at'),
+                             last_completed_at=Max('completed_at'))
+                   .order_by('-last_completed_at'))
+    trend = list(completed_sessions(user_id)
+                 .annotate(period=BUCKETS[bucket]('completed_at'))
+                 .values('period')
+                 .annotate(attempts=Count('id'),
+                           average_score=Avg('score'),
+                           best_score=Max('score'))
+                 .order_by('-period')[:settings.HISTORY_TREND_PERIODS])
+    trend.reverse()
+
+    attempts = sum(quiz['attempts'] for quiz in quizzes)
+    for quiz in quizzes:
+        quiz['quiz'] = quiz.pop('quiz_id')
+    return {
+        'attempts': attempts,
+        'best_score': max((quiz['best_score'] for quiz in quizzes), default=None),
+        'average_score': (sum(quiz['average_score'] * quiz['attempts'] for quiz in quizzes)
+                          / attempts if attempts else None),
+        'bucket': bucket,
+        'quizzes': quizzes,
+        'trend': trend,
+    }
+
+
+def get_history(user_id, bucket='week'):
+    """Returns the history of a user, cached until their next completion."""
+    key = api_cache.key(user_namespace(user_id), api_cache.version(GLOBAL_NAMESPACE), bucket)
+    return api_cache.get_or_set(key, lambda: build_history(user_id, bucket),
+                                settings.HISTORY_CACHE_TTL)
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db.models import Count, Q
+from django.db.models.functions import Floor
+
+from api.cache import api_cache
+from session.models import QuizSession
+
+# One bucket per integer score, the last one also holds scores above 100
+BUCKETS = 101
+
+
+def bucket_of(score):
+    return min(max(int(score), 0), BUCKETS - 1)
+
+
+def completed_sessions(quiz_id):
+    return QuizSession.objects.filter(quiz_id=quiz_id, is_completed=True)
+
+
+def histogram_key(quiz_id):
+    return f'leaderboard:{quiz_id}:histogram'
+
+
+def build_histogram(quiz_id):
+    """Counts completed sessions of the quiz per score bucket."""
+    histogram = [0] * BUCKETS
+    rows = (completed_sessions(quiz_id)
+            .values(bucket=Floor('score'))
+            .annotate(sessions=Count('id'))
+            .order_by())
+    for row in rows:
+        histogram[bucket_of(row['bucket'])] += row['sessions']
+    return histogram
+
+
+def get_histogram(quiz_id):
+    return api_cache.get_or_set(histogram_key(quiz_id),
+                                lambda: build_histogram(quiz_id),
+                                settings.LEADERBOARD_HISTOGRAM_TTL)
+
+
+def record_score(quiz_id, score):
+    """
+    Adds a newly completed session to the cached histogram. Increments
+    racing across processes may get lost, the histogram is rebuilt from
+    the database when it expires.
+    """
+    key = histogram_key(quiz_id)
+    histogram = api_cache.shared.get(key)
+    if histogram is None:
+        return
+    histogram[bucket_of(score)] += 1
+    api_cache.set(key, histogram, settings.LEADERBOARD_HISTOGRAM_TTL)
+
+
+def invalidate(quiz_id):
+    """Drops the cached histogram after scores of the quiz were rewritten."""
+    api_cache.delete(histogram_key(quiz_id))
+
+
+def top_sessions(quiz_id, limit):
+    """Returns the best completed sessions of the quiz with competition ranks."""
+    sessions = (completed_sessions(quiz_id)
+                .select_related('user')
+                .order_by('-score', 'completed_at')[:limit])
+    entries = []
+    for position, session in enumerate(sessions, start=1):
+        rank = (entries[-1]['rank'] if entries and entries[-1]['score'] == session.score
+                else position)
+        entries.append({
+            'rank': rank,
+            'session': session.pk,
+            'username': session.user.username if session.user else None,
+            'score': session.score,
+            'completed_at': session.completed_at,
+        })
+    return entries
+
+
+def user_standing(quiz_id, user):
+    """
+    Returns rank and percentile of the user's best session. Sessions in
+    higher buckets are taken from the histogram, only the user's own
+    bucket is counted in the database through the leaderboard index.
+    """
+    best = (completed_sessions(quiz_id).filter(user=user)
+            .order_by('-score', 'completed_at').first())
+    if best is None:
+        return None
+    histogram = get_histogram(quiz_id)
+    bucket = bucket_of(best.score)
+    in_bucket = completed_sessions(quiz_id).filter(score__gte=best.score)
+    if bucket < BUCKETS - 1:
+        in_bucket = in_bucket.filter(score__lt=bucket + 1)
+    counts = in_bucket.aggregate(above=Count('id', filter=Q(score__gt=best.score)),
+                                 same=Count('id', filter=Q(score=best.score)))
+    above = sum(histogram[bucket + 1:]) + counts['above']
+    total = max(sum(histogram), above + counts['same'])
+    below = total - above - counts['same']
+    return {
+        'rank': above + 1,
+        'session': best.pk,
+        'score': best.score,
+        'total_sessions': total,
+        'percentile': round(below / total * 100, 2),
+    }
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from session.results import build_missing_results
+
+
+class Command(BaseCommand):
+    help = ('Stores the result documents of completed sessions that have none, '
+            'e.g. after a regrade dropped them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, default=None,
+                            help='Only build the documents of this quiz id.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of sessions updated per transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        built = build_missing_results(options['quiz'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Built {built} session result documents.'))
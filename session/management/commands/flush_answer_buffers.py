@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from session import answer_buffer
+from session.models import QuizSession
+
+
+class Command(BaseCommand):
+    help = ('Writes buffered in-progress answers of sessions that were inactive '
+            'for ANSWER_BUFFER_TIMEOUT seconds to the database. Run it periodically.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=settings.ANSWER_BUFFER_TIMEOUT,
+                            help='Seconds of inactivity before a buffer is flushed.')
+
+    def handle(self, *args, **options):
+        session_ids = answer_buffer.stale_session_ids(options['timeout'])
+        sessions = QuizSession.objects.in_bulk(session_ids)
+        responses = busy = 0
+        for session_id in session_ids:
+            session = sessions.get(session_id)
+            try:
+                if session is None:
+                    # The session was purged, its answers have nowhere to go
+                    answer_buffer.discard(session_id)
+                    continue
+                responses += answer_buffer.flush(session)
+            except answer_buffer.BufferBusy:
+                # A request is changing the buffer, the session is active again
+                busy += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Flushed {responses} responses of {len(sessions) - busy} sessions, '
+            f'skipped {busy} busy sessions.'))
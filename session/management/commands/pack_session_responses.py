@@ -0,0 +1,52 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from session.models import QuizSession, Response
+from session.packing import pack_ids
+
+
+class Command(BaseCommand):
+    help = ('Moves the Response rows of completed sessions into the packed '
+            'answer_vector column, one batch of sessions per transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of sessions packed per transaction.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+        pending = (QuizSession.objects
+                   .filter(is_completed=True, answer_vector__isnull=True)
+                   .order_by('id'))
+        last_id = 0
+        sessions_packed = responses_packed = 0
+        while True:
+            session_ids = list(pending.filter(id__gt=last_id)
+                               .values_list('id', flat=True)[:batch_size])
+            if not session_ids:
+                break
+            last_id = session_ids[-1]
+            with transaction.atomic():
+                rows = list(Response.objects
+                            .filter(session_id__in=session_ids)
+                            .order_by('session_id', 'question_id', 'selected_answer_id')
+                            .values_list('session_id', 'selected_answer_id', 'id'))
+                vectors = {session_id: [] for session_id in session_ids}
+                for session_id, group in groupby(rows, key=lambda row: row[0]):
+                    vectors[session_id] = [answer_id for _, answer_id, _ in group]
+                QuizSession.objects.bulk_update(
+                    [QuizSession(id=session_id, answer_vector=pack_ids(answer_ids))
+                     for session_id, answer_ids in vectors.items()],
+                    ['answer_vector'])
+                # Only the rows that were packed, a response added meanwhile is kept
+                deleted, _ = Response.objects.filter(pk__in=[pk for _, _, pk in rows]).delete()
+            sessions_packed += len(session_ids)
+            responses_packed += deleted
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Packed sessions up to id {last_id}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Packed {responses_packed} responses of {sessions_packed} sessions.'))
@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from session.models import QuizSession, Response
+
+
+class Command(BaseCommand):
+    help = ('Deletes incomplete quiz sessions older than the given age, '
+            'together with their responses, in short keyset-paginated batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=24,
+                            help='Minimum session age in hours (default: 24).')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of sessions deleted per transaction.')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep after each batch to let other writers in.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would be deleted.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        stale = QuizSession.objects.filter(is_completed=False, started_at__lt=cutoff)
+
+        if options['dry_run']:
+            sessions = stale.count()
+            responses = Response.objects.filter(session__in=stale).count()
+            self.stdout.write(f'Would delete {sessions} sessions and {responses} responses '
+                              f'started before {cutoff:%Y-%m-%d %H:%M:%S}.')
+            return
+
+        sessions_deleted = responses_deleted = 0
+        started = time.monotonic()
+        last = 0
+        while True:
+            # Keyset batches only visit stale ids, however sparse they are
+            ids = list(stale.filter(id__gt=last).order_by('id')
+                       .values_list('id', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            last = ids[-1]
+            chunk = stale.filter(id__in=ids)
+            with transaction.atomic():
+                responses, _ = Response.objects.filter(session__in=chunk).delete()
+                sessions, _ = chunk.delete()
+            responses_deleted += responses
+            sessions_deleted += sessions
+            if options['verbosity'] > 1:
+                self.stdout.write(f'ids {ids[0]}..{last}: '
+                                  f'{sessions} sessions, {responses} responses')
+            if sessions:
+                time.sleep(options['pause'])
+
+        if not sessions_deleted:
+            self.stdout.write('No stale sessions found.')
+            return
+        elapsed = time.monotonic() - started
+        rows = sessions_deleted + responses_deleted
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {sessions_deleted} sessions and {responses_deleted} responses '
+            f'in {elapsed:.1f}s ({rows / elapsed if elapsed else rows:.0f} rows/s).'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from session import analytics
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds per-question and per-answer rollups from completed sessions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, default=None,
+                            help='Only rebuild the rollups of this quiz id.')
+
+    def handle(self, *args, **options):
+        questions, answers = analytics.rebuild(options['quiz'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {questions} question and {answers} answer stat rows.'))
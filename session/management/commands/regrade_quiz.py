@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.models import Quiz
+from session.regrade import regrade_quiz
+
+
+class Command(BaseCommand):
+    help = ('Rescores every completed session of a quiz against its current answer key, '
+            'after an Answer.is_correct flag was fixed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz', type=int, nargs='+', help='Quiz ids to regrade.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only show the scores that would change.')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Sessions written per UPDATE (default: REGRADE_BATCH_SIZE).')
+        parser.add_argument('--skip-results', action='store_true',
+                            help='Leave the dropped result documents to build_session_results.')
+        parser.add_argument('--show', type=int, default=20,
+                            help='Number of changed scores to list (default: 20).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        missing = set(options['quiz']) - set(Quiz.objects.filter(pk__in=options['quiz'])
+                                             .values_list('id', flat=True))
+        if missing:
+            raise CommandError(f'Quiz not found: {", ".join(map(str, sorted(missing)))}.')
+
+        for quiz_id in options['quiz']:
+            started = time.monotonic()
+            sessions, changes = regrade_quiz(quiz_id,
+                                             dry_run=options['dry_run'],
+                                             batch_size=options['batch_size'],
+                                             build_results=not options['skip_results'])
+            elapsed = time.monotonic() - started
+            for session_id, old_score, new_score in changes[:options['show']]:
+                self.stdout.write(f'  session {session_id}: {old_score:.2f} -> {new_score:.2f}')
+            if len(changes) > options['show']:
+                self.stdout.write(f'  ... and {len(changes) - options["show"]} more')
+            verb = 'Would change' if options['dry_run'] else 'Changed'
+            self.stdout.write(self.style.SUCCESS(
+                f'Quiz {quiz_id}: {verb} {len(changes)} of {sessions} session scores '
+                f'in {elapsed:.2f}s.'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_search_index'),
+        ('session', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('times_selected', models.PositiveIntegerField(default=0)),
+                ('answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stat', to='quiz.answer')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_stats', to='quiz.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_stats', to='quiz.quiz')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('correct_responses', models.PositiveIntegerField(default=0)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stat', to='quiz.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_stats', to='quiz.quiz')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session', '0002_answerstat_questionstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsession',
+            name='answer_vector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session', '0003_quizsession_answer_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsession',
+            name='question_vector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
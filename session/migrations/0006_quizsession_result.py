@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('session', '0005_quizsession_leaderboard_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsession',
+            name='result',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_quiz_completions_score_sum'),
+        ('session', '0006_quizsession_result'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsession',
+            name='client_attempt_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='quizsession',
+            constraint=models.UniqueConstraint(fields=('user', 'client_attempt_id'), name='session_client_attempt_uniq'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_quiz_completions_score_sum'),
+        ('session', '0007_quizsession_client_attempt_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizsession',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['user', 'completed_at'], name='session_user_history_idx'),
+        ),
+    ]
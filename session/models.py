@@ -1,7 +1,10 @@
 from datetime import datetime
-from django.db import models
+from django.db import models, transaction
 
+from api.events import broker
+from quiz.counters import counters
 from quiz.models import Answer, Question, Quiz
+from session.packing import pack_ids, unpack_ids
 from users.models import User
 
 
@@ -18,21 +21,160 @@ class QuizSession(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     score = models.FloatField(default=0)
     is_completed = models.BooleanField(default=False)
+    # Selected answer ids in question order, replaces Response rows once completed
+    answer_vector = models.BinaryField(null=True, blank=True, editable=False)
+    # Question ids drawn from the quiz pool, in the order they are asked
+    question_vector = models.BinaryField(null=True, blank=True, editable=False)
+    # Result document built on completion, see session/results.py
+    result = models.JSONField(null=True, blank=True, editable=False)
+    # Attempt id assigned by offline clients, see api/sync.py
+    client_attempt_id = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Leaderboard top-N and rank lookups
+            models.Index(fields=['quiz', '-score', 'completed_at'],
+                         condition=models.Q(is_completed=True),
+                         name='session_leaderboard_idx'),
+            # Per-user history and trend
+            models.Index(fields=['user', 'completed_at'],
+                         condition=models.Q(is_completed=True),
+                         name='session_user_history_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_attempt_id'],
+                                    name='session_client_attempt_uniq'),
+        ]
+
+    @property
+    def is_packed(self):
+        return self.answer_vector is not None
+
+    @property
+    def question_ids(self):
+        """Returns the drawn question ids, or None if the session uses all quiz questions"""
+        return unpack_ids(self.question_vector) if self.question_vector is not None else None
+
+    def draw_questions(self):
+        """Draws the questions of this session from the quiz question pool"""
+        from quiz.pools import draw_question_ids
+
+        question_ids = draw_question_ids(self.quiz)
+        self.question_vector = pack_ids(question_ids) if question_ids is not None else None
+
+    @property
+    def answer_ids(self):
+        """Returns the selected answer ids of a packed session"""
+        return unpack_ids(self.answer_vector) if self.is_packed else []
+
+    def get_response_rows(self):
+        """Returns (question_id, answer_id, is_correct) for every response in question order"""
+        if not self.is_packed:
+            return [row[1:] for row in self.read_responses()]
+        answer_ids = self.answer_ids
+        answers = Answer.objects.only('question_id', 'is_correct').in_bulk(set(answer_ids))
+        return [(answers[answer_id].question_id, answer_id, answers[answer_id].is_correct)
+                for answer_id in answer_ids if answer_id in answers]
+
+    def read_responses(self):
+        """Returns (pk, question_id, answer_id, is_correct) for every Response row in question order"""
+        return list(self.responses
+                    .order_by('question_id', 'selected_answer_id')
+                    .values_list('id', 'question_id', 'selected_answer_id',
+                                 'selected_answer__is_correct'))
+
+    def pack_responses(self, rows=None, response_ids=None):
+        """
+        Moves the session responses into answer_vector and deletes the Response rows.
+
+        Callers that already read the rows pass the (question_id, answer_id,
+        is_correct) rows to pack and the pks of the Response rows they read,
+        inside the same transaction. Only those pks are deleted, so a response
+        added concurrently is never dropped without being packed.
+        """
+        with transaction.atomic():
+            if rows is None:
+                responses = self.read_responses()
+                rows = [row[1:] for row in responses]
+                response_ids = [row[0] for row in responses]
+            self.answer_vector = pack_ids([answer_id for _, answer_id, _ in rows])
+            self.save(update_fields=['answer_vector'])
+            Response.objects.filter(pk__in=response_ids).delete()
+
+    def get_result(self):
+        """
+        Returns the result document of a completed session. A missing document
+        is built in memory without saving it, build_session_results stores it
+        """
+        from session.results import build_result
+
+        if self.result is None and self.is_completed:
+            return build_result(self, self.get_filtered_response_rows())
+        return self.result
+
+    def get_filtered_response_rows(self, rows=None):
+        """Returns the response rows to the questions drawn for this session"""
+        if rows is None:
+            rows = self.get_response_rows()
+        question_ids = self.question_ids
+        if question_ids is not None:
+            drawn = set(question_ids)
+            rows = [row for row in rows if row[0] in drawn]
+        return rows
 
     def calculate_score(self):
         """Calculates and saves the user score for this session"""
-        correct_responses = 0
-        total_questions = self.quiz.question_count
-        responses = self.responses.select_related('question', 'selected_answer')
+        from session import analytics, answer_buffer, history, leaderboard
+        from session.results import build_result
+
+        answer_buffer.flush(self)
+        with transaction.atomic():
+            # The rows are read in the transaction that packs them, see pack_responses
+            response_ids = None
+            if self.is_packed:
+                rows = self.get_response_rows()
+            else:
+                responses = self.read_responses()
+                rows = [row[1:] for row in responses]
+                response_ids = [row[0] for row in responses]
+            # Only responses to the drawn questions count
+            rows = self.get_filtered_response_rows(rows)
+            question_ids = self.question_ids
+            if question_ids is None:
+                total_questions = self.quiz.question_count
+            else:
+                total_questions = len(question_ids)
 
-        for response in responses:
-            if response.selected_answer.is_correct:
-                correct_responses += 1
+            correct_responses = 0
+            for _, _, is_correct in rows:
+                if is_correct:
+                    correct_responses += 1
 
-        self.score = (correct_responses / total_questions) * 100
-        self.is_completed = True
-        self.completed_at = datetime.now()
-        self.save()
+            newly_completed = not self.is_completed
+            self.score = (correct_responses / total_questions) * 100
+            self.is_completed = True
+            self.completed_at = datetime.now()
+            self.result = build_result(self, rows)
+            self.save()
+            if newly_completed:
+                analytics.record_responses(self.quiz_id, rows)
+                score = self.score
+                transaction.on_commit(
+                    lambda: counters.add(self.quiz_id, completions=1, score_sum=score))
+                transaction.on_commit(lambda: leaderboard.record_score(self.quiz_id, score))
+            event = {
+                'type': 'completed' if newly_completed else 'score',
+                'session': self.pk,
+                'user': self.user.username if self.user else None,
+                'score': self.score,
+                'completed_at': self.completed_at.isoformat(),
+            }
+            transaction.on_commit(lambda: broker.publish(self.quiz_id, event))
+            if self.user_id:
+                transaction.on_commit(lambda: history.invalidate(self.user_id))
+            if response_ids is not None:
+                # Responses to questions that were not drawn are dropped as well
+                self.pack_responses(rows, response_ids)
 
     def __str__(self):
         return f'Session: {self.user.username} - {self.quiz.title} - {"Completed" if self.is_completed else "In Progress"}'
@@ -50,3 +192,40 @@ class Response(models.Model):
 
     def __str__(self):
         return f'Response: session {self.session.id} - {self.question.prompt} - {self.selected_answer.answer_text}'
+
+
+class QuestionStat(models.Model):
+    """Rollup of responses to a question in completed sessions"""
+    question = models.OneToOneField(Question,
+                                    related_name='stat',
+                                    on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz,
+                             related_name='question_stats',
+                             on_delete=models.CASCADE)
+    responses = models.PositiveIntegerField(default=0)
+    correct_responses = models.PositiveIntegerField(default=0)
+
+    @property
+    def correct_rate(self):
+        """Returns the share of correct responses to the question"""
+        return self.correct_responses / self.responses if self.responses else None
+
+    def __str__(self):
+        return f'Stat: {self.question.prompt} - {self.correct_responses}/{self.responses}'
+
+
+class AnswerStat(models.Model):
+    """Rollup of how often an answer was selected in completed sessions"""
+    answer = models.OneToOneField(Answer,
+                                  related_name='stat',
+                                  on_delete=models.CASCADE)
+    question = models.ForeignKey(Question,
+                                 related_name='answer_stats',
+                                 on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz,
+                             related_name='answer_stats',
+                             on_delete=models.CASCADE)
+    times_selected = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'Stat: {self.answer.answer_text} - {self.times_selected}'
@@ -0,0 +1,22 @@
+import sys
+from array import array
+
+# Signed 64-bit ids, stored little-endian regardless of the host
+TYPECODE = 'q'
+
+
+def pack_ids(ids):
+    """Packs a sequence of integer ids into bytes."""
+    packed = array(TYPECODE, ids)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_ids(data):
+    """Unpacks bytes produced by pack_ids() into a list of ids."""
+    unpacked = array(TYPECODE)
+    unpacked.frombytes(bytes(data))
+    if sys.byteorder == 'big':
+        unpacked.byteswap()
+    return unpacked.tolist()
@@ -0,0 +1,154 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from quiz.counters import counters
+from quiz.models import Answer, Question
+from session.models import QuizSession, Response
+from session.results import build_missing_results
+
+# Packed vectors are signed 64-bit little-endian ids, see session/packing.py
+ID_DTYPE = np.dtype('<i8')
+LOAD_CHUNK_SIZE = 5000
+
+
+def _concatenate(vectors):
+    """Returns the ids of all vectors as one array plus the length of each vector."""
+    lengths = np.fromiter((len(vector) // ID_DTYPE.itemsize for vector in vectors),
+                          dtype=np.int64, count=len(vectors))
+    ids = np.frombuffer(b''.join(vectors), dtype=ID_DTYPE).astype(np.int64)
+    return ids, lengths
+
+
+def load_sessions(quiz_id):
+    """
+    Loads the completed sessions of a quiz as flat integer arrays: one
+    entry per selected answer, tagged with the position of its session,
+    plus the drawn questions of the sessions that use a question pool.
+    """
+    session_ids = []
+    scores = []
+    answer_vectors = []
+    question_vectors = []
+    packed = (QuizSession.objects
+              .filter(quiz_id=quiz_id, is_completed=True)
+              .order_by('id')
+              .values_list('id', 'score', 'answer_vector', 'question_vector'))
+    for session_id, score, answer_vector, question_vector in packed.iterator(
+            chunk_size=LOAD_CHUNK_SIZE):
+        session_ids.append(session_id)
+        scores.append(score)
+        answer_vectors.append(bytes(answer_vector) if answer_vector is not None else b'')
+        question_vectors.append(bytes(question_vector) if question_vector is not None else b'')
+
+    answers, answer_lengths = _concatenate(answer_vectors)
+    answer_sessions = np.repeat(np.arange(len(session_ids)), answer_lengths)
+    drawn, drawn_lengths = _concatenate(question_vectors)
+    drawn_sessions = np.repeat(np.arange(len(session_ids)), drawn_lengths)
+    session_ids = np.array(session_ids, dtype=np.int64)
+
+    # Completed sessions that were never packed still have Response rows
+    unpacked = (Response.objects
+                .filter(session__quiz_id=quiz_id, session__is_completed=True,
+                        session__answer_vector__isnull=True)
+                .values_list('session_id', 'selected_answer_id'))
+    rows = np.array(list(unpacked.iterator(chunk_size=LOAD_CHUNK_SIZE)),
+                    dtype=np.int64).reshape(-1, 2)
+    if len(rows):
+        answers = np.concatenate([answers, rows[:, 1]])
+        answer_sessions = np.concatenate([answer_sessions,
+                                          np.searchsorted(session_ids, rows[:, 0])])
+    return {
+        'session_ids': session_ids,
+        'scores': np.array(scores, dtype=np.float64),
+        'answers': answers,
+        'answer_sessions': answer_sessions,
+        'drawn': drawn,
+        'drawn_sessions': drawn_sessions,
+        'has_pool': drawn_lengths > 0,
+        'drawn_counts': drawn_lengths,
+    }
+
+
+def score_sessions(quiz_id, data):
+    """
+    Scores every loaded session against the current answer key the same
+    way QuizSession.calculate_score does: correct selected answers to the
+    drawn questions divided by the number of questions.
+    """
+    key = np.array(list(Answer.objects.filter(question__quiz_id=quiz_id)
+                        .order_by('id')
+                        .values_list('id', 'question_id', 'is_correct')),
+                   dtype=np.int64).reshape(-1, 3)
+    sessions = len(data['session_ids'])
+    answers = data['answers']
+    if len(key):
+        position = np.minimum(np.searchsorted(key[:, 0], answers), len(key) - 1)
+        known = key[position, 0] == answers
+        question_ids = np.where(known, key[position, 1], -1)
+        correct = known & (key[position, 2] == 1)
+    else:
+        question_ids = np.full(len(answers), -1, dtype=np.int64)
+        correct = np.zeros(len(answers), dtype=bool)
+
+    # Sessions drawn from a pool only count answers to their drawn questions
+    answer_sessions = data['answer_sessions']
+    pooled = data['has_pool'][answer_sessions]
+    if pooled.any():
+        stride = int(max(question_ids.max(initial=0), data['drawn'].max(initial=0))) + 1
+        drawn_keys = data['drawn_sessions'] * stride + data['drawn']
+        answer_keys = answer_sessions * stride + question_ids
+        correct &= ~pooled | np.isin(answer_keys, drawn_keys)
+
+    correct_counts = np.bincount(answer_sessions[correct], minlength=sessions)
+    question_count = Question.objects.filter(quiz_id=quiz_id).count()
+    totals = np.where(data['has_pool'], data['drawn_counts'], question_count).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(totals > 0, correct_counts / totals * 100, 0.0)
+    return scores
+
+
+def regrade_quiz(quiz_id, dry_run=False, batch_size=None, build_results=True):
+    """
+    Rescores all completed sessions of a quiz after its answer key changed.
+
+    Returns the number of sessions and a list of
+    (session_id, old_score, new_score) for the scores that changed. Unless
+    dry_run is set, the changed scores are written in batches, the result
+    documents of the quiz are rebuilt (or only dropped, without
+    build_results), and the analytics rollups, score sum and leaderboard of
+    the quiz and the cached score histories are brought up to date.
+    """
+    from session import analytics, history, leaderboard
+
+    data = load_sessions(quiz_id)
+    new_scores = score_sessions(quiz_id, data)
+    old_scores = data['scores']
+    changed = np.flatnonzero(~np.isclose(old_scores, new_scores, rtol=0, atol=1e-9))
+    changes = [(int(data['session_ids'][index]), float(old_scores[index]),
+                float(new_scores[index]))
+               for index in changed]
+    if dry_run:
+        return len(data['session_ids']), changes
+
+    batch_size = batch_size or settings.REGRADE_BATCH_SIZE
+    # Scores only take a handful of distinct values, so one UPDATE per
+    # score and batch of ids is much cheaper than a CASE per row
+    session_ids = data['session_ids'][changed]
+    changed_scores = new_scores[changed]
+    with transaction.atomic():
+        for score in np.unique(changed_scores):
+            ids = session_ids[changed_scores == score].tolist()
+            for start in range(0, len(ids), batch_size):
+                QuizSession.objects.filter(pk__in=ids[start:start + batch_size]).update(
+                    score=float(score))
+        # Every document lists the correct answers, not just the changed ones
+        QuizSession.objects.filter(quiz_id=quiz_id, result__isnull=False).update(result=None)
+        score_delta = float(new_scores[changed].sum() - old_scores[changed].sum())
+        transaction.on_commit(lambda: counters.add(quiz_id, score_sum=score_delta))
+        transaction.on_commit(lambda: leaderboard.invalidate(quiz_id))
+        transaction.on_commit(history.invalidate_all)
+    if build_results:
+        build_missing_results(quiz_id)
+    analytics.rebuild(quiz_id)
+    return len(data['session_ids']), changes
@@ -0,0 +1,106 @@
+from django.db import transaction
+
+from quiz.models import Answer, Question
+
+
+def load_content(quiz_id, question_ids=None):
+    """
+    Loads what build_result needs to know about the questions of a quiz,
+    or of the given question ids only: prompts in question order, answer
+    texts and the correct answers per question.
+    """
+    questions = (Question.objects.filter(quiz_id=quiz_id) if question_ids is None
+                 else Question.objects.filter(pk__in=question_ids))
+    prompts = dict(questions.values_list('id', 'prompt'))
+    answers = {}
+    correct_answers = {}
+    for answer_id, question_id, answer_text, is_correct in (
+            Answer.objects.filter(question_id__in=list(prompts))
+            .order_by('id')
+            .values_list('id', 'question_id', 'answer_text', 'is_correct')):
+        answers[answer_id] = answer_text
+        if is_correct:
+            correct_answers.setdefault(question_id, []).append(answer_id)
+    return {'prompts': prompts, 'answers': answers, 'correct_answers': correct_answers}
+
+
+def build_result(session, rows, content=None):
+    """
+    Builds the result document of a completed session from its response
+    rows: the score and, per question, whether it was answered correctly
+    with the chosen and the correct answers. Pass the load_content() of the
+    whole quiz to build many documents without querying for each one.
+
+    The document is stored on the session, so result pages don't have to
+    join the responses, questions and answers again.
+    """
+    question_ids = session.question_ids
+    if content is None:
+        content = load_content(session.quiz_id, question_ids)
+    prompts = content['prompts']
+    answers = content['answers']
+    correct_answers = content['correct_answers']
+    if question_ids is None:
+        questions = list(prompts)
+    else:
+        questions = [question_id for question_id in question_ids if question_id in prompts]
+
+    selected = {}
+    for question_id, answer_id, is_correct in rows:
+        selected.setdefault(question_id, []).append((answer_id, is_correct))
+
+    return {
+        'quiz_title': session.quiz.title,
+        'user_username': session.user.username if session.user else None,
+        'score': session.score,
+        'question_count': len(questions),
+        'correct_count': sum(1 for _, _, is_correct in rows if is_correct),
+        'questions': [
+            {'question': question_id,
+             'prompt': prompts[question_id],
+             'is_correct': (bool(selected.get(question_id))
+                            and all(is_correct for _, is_correct in selected[question_id])),
+             'selected_answers': [{'id': answer_id, 'text': answers.get(answer_id, '')}
+                                  for answer_id, _ in selected.get(question_id, [])],
+             'correct_answers': [{'id': answer_id, 'text': answers[answer_id]}
+                                 for answer_id in correct_answers.get(question_id, [])]}
+            for question_id in questions
+        ],
+        # Same shape as the responses of the session API
+        'responses': [
+            {'id': None,
+             'session': session.pk,
+             'question': question_id,
+             'question_text': prompts.get(question_id, ''),
+             'selected_answer': answer_id,
+             'selected_answer_text': answers.get(answer_id, '')}
+            for question_id, answer_id, _ in rows
+        ],
+    }
+
+
+def build_missing_results(quiz_id=None, batch_size=500):
+    """
+    Stores the result documents of completed sessions that have none, e.g.
+    after a regrade dropped them. Returns the number of documents built.
+    """
+    from session.models import QuizSession
+
+    missing = (QuizSession.objects
+               .filter(is_completed=True, result__isnull=True)
+               .select_related('quiz', 'user')
+               .order_by('id'))
+    if quiz_id is not None:
+        missing = missing.filter(quiz_id=quiz_id)
+    built = 0
+    last_id = 0
+    while True:
+        sessions = list(missing.filter(id__gt=last_id)[:batch_size])
+        if not sessions:
+            return built
+        last_id = sessions[-1].pk
+        for session in sessions:
+            session.result = build_result(session, session.get_filtered_response_rows())
+        with transaction.atomic():
+            QuizSession.objects.bulk_update(sessions, ['result'])
+        built += len(sessions)
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.provisioning import parse_users, provision_users
+
+
+class Command(BaseCommand):
+    help = ('Creates users in bulk from a CSV file with a header row or a JSON list, '
+            'with the columns username, email, first_name, last_name and role.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON file, "-" reads standard input.')
+        parser.add_argument('--format', choices=('csv', 'json'),
+                            help='Input format (default: from the file extension).')
+        parser.add_argument('--no-email', action='store_true',
+                            help='Do not send confirmation emails.')
+        parser.add_argument('--tokens', metavar='OUTPUT',
+                            help='Write the created users with access tokens to this JSON file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in ('csv', 'json'):
+            raise CommandError('Cannot guess the input format, pass --format.')
+        try:
+            if path == '-':
+                content = sys.stdin.read()
+            else:
+                with open(path, encoding='utf-8-sig') as file:
+                    content = file.read()
+            rows = parse_users(content, fmt)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        started = time.monotonic()
+        result = provision_users(rows,
+                                 send_emails=not options['no_email'],
+                                 issue_tokens=bool(options['tokens']))
+        elapsed = time.monotonic() - started
+
+        for error in result['errors']:
+            messages = '; '.join(f'{field}: {" ".join(errors)}'
+                                 for field, errors in error['errors'].items())
+            self.stderr.write(f'Row {error["row"]} ({error["username"] or "-"}): {messages}')
+        if options['tokens']:
+            with open(options['tokens'], 'w') as file:
+                json.dump(result['created'], file, indent=2)
+        self.stdout.write(f'Created {len(result["created"])} users, skipped '
+                          f'{len(result["errors"])} rows in {elapsed:.2f}s.')
@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.mail import send_mass_mail
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import ROLES, USER, User
+from users.validators import validate_username
+
+FIELDS = ('username', 'email', 'first_name', 'last_name', 'role')
+ROLE_VALUES = {role for role, _ in ROLES}
+# Inserts retried after losing a race with concurrent signups
+INSERT_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+def parse_users(content, fmt):
+    """Parses a CSV document with a header row or a JSON list into dicts."""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(content)))
+    if fmt == 'json':
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get('users')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError('Expected a list of user objects.')
+        return data
+    raise ValueError(f'Unsupported format "{fmt}".')
+
+
+def _clean_row(row):
+    """Returns the cleaned user fields of a row and its validation errors."""
+    cleaned = {field: str(row.get(field) or '').strip() for field in FIELDS}
+    cleaned['role'] = cleaned['role'] or USER
+    errors = {}
+    if not cleaned['username']:
+        errors['username'] = ['This field is required.']
+    elif len(cleaned['username']) > settings.MAX_USERNAME_LENGTH:
+        errors['username'] = [f'Ensure this field has no more than '
+                              f'{settings.MAX_USERNAME_LENGTH} characters.']
+    else:
+        try:
+            validate_username(cleaned['username'])
+        except ValidationError as error:
+            errors['username'] = error.messages
+    try:
+        if len(cleaned['email']) > settings.MAX_EMAIL_LENGTH:
+            raise ValidationError('Enter a valid email address.')
+        validate_email(cleaned['email'])
+    except ValidationError as error:
+        errors['email'] = error.messages
+    if cleaned['role'] not in ROLE_VALUES:
+        errors['role'] = [f'"{cleaned["role"]}" is not a valid choice.']
+    return cleaned, errors
+
+
+def _send_confirmations(users):
+    """Sends the confirmation codes, one SMTP connection per batch."""
+    batch_size = settings.PROVISION_EMAIL_BATCH_SIZE
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        try:
+            send_mass_mail(
+                [('Signup confirmation',
+                  f'Your confirmation code: "{default_token_generator.make_token(user)}".',
+                  settings.FROM_EMAIL,
+                  (user.email,))
+                 for user in batch],
+                fail_silently=False,
+            )
+        except Exception:
+            logger.exception('Failed to send %d confirmation emails to %s ... %s',
+                             len(batch), batch[0].email, batch[-1].email)
+
+
+def queue_confirmations(users):
+    """
+    Sends the confirmation emails from a background thread, so building
+    thousands of messages does not hold up the caller.
+    """
+    if users:
+        threading.Thread(target=_send_confirmations, args=(users,),
+                         name='provision-confirmations').start()
+
+
+def _without_conflicts(candidates):
+    """
+    Builds the users of the rows that conflict neither with existing users
+    nor with an earlier row, detected with a single query. Returns the users
+    and the errors of the conflicting rows.
+    """
+    usernames = {cleaned['username'] for _, cleaned in candidates}
+    emails = {cleaned['email'] for _, cleaned in candidates}
+    taken_usernames = set()
+    taken_emails = set()
+    for username, email in (User.objects
+                            .filter(Q(username__in=usernames) | Q(email__in=emails))
+                            .values_list('username', 'email')):
+        taken_usernames.add(username)
+        taken_emails.add(email)
+
+    users = []
+    errors = []
+    for index, cleaned in candidates:
+        row_errors = {}
+        if cleaned['username'] in taken_usernames:
+            row_errors['username'] = ['A user with that username already exists.']
+        if cleaned['email'] in taken_emails:
+            row_errors['email'] = ['A user with that email already exists.']
+        if row_errors:
+            errors.append({'row': index, 'username': cleaned['username'], 'errors': row_errors})
+            continue
+        # Later duplicates within the same upload conflict with the first one
+        taken_usernames.add(cleaned['username'])
+        taken_emails.add(cleaned['email'])
+        users.append(User(username=cleaned['username'],
+                          email=cleaned['email'],
+                          first_name=cleaned['first_name'] or None,
+                          last_name=cleaned['last_name'] or None,
+                          role=cleaned['role'],
+                          is_active=True))
+    return users, errors
+
+
+def _insert(users, send_emails):
+    User.objects.bulk_create(users, batch_size=settings.PROVISION_BATCH_SIZE)
+    if users and users[0].pk is None:
+        # Backends that can't return the primary keys of inserted rows
+        ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                   .values_list('username', 'id'))
+        for user in users:
+            user.pk = ids[user.username]
+    if send_emails:
+        transaction.on_commit(lambda: queue_confirmations(users))
+
+
+def provision_users(rows, send_emails=True, issue_tokens=False):
+    """
+    Creates users in bulk.
+
+    Rows are validated up front, conflicts with existing users and between
+    rows are detected with a single query, and the valid rows are inserted
+    with bulk_create. When a concurrent signup or upload takes a name in
+    between, the insert is rolled back and the conflicts are detected
+    again. Invalid and conflicting rows are skipped and reported with their
+    index. Confirmation emails are queued in batches once the transaction
+    has committed; with issue_tokens the users are returned with an access
+    token so they don't need to confirm their email first.
+    """
+    errors = []
+    candidates = []
+    for index, row in enumerate(rows):
+        cleaned, row_errors = _clean_row(row)
+        if row_errors:
+            errors.append({'row': index, 'username': cleaned['username'], 'errors': row_errors})
+        else:
+            candidates.append((index, cleaned))
+
+    for attempt in range(INSERT_ATTEMPTS):
+        users, conflicts = _without_conflicts(candidates)
+        try:
+            with transaction.atomic():
+                _insert(users, send_emails)
+            break
+        except IntegrityError:
+            # A concurrent signup or upload took some of the names since
+            # they were checked, detect the conflicts again and retry
+            if attempt == INSERT_ATTEMPTS - 1:
+                raise
+    errors += conflicts
+
+    created = []
+    for user in users:
+        entry = {'username': user.username, 'email': user.email, 'role': user.role}
+        if issue_tokens:
+            entry['token'] = f'{AccessToken.for_user(user)}'
+        created.append(entry)
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'errors': errors}
@@ -2,17 +2,17 @@ import re
 
 from django.core.exceptions import ValidationError
 
+USERNAME_PATTERN = re.compile(r'^[\w.@+-]+\Z')
+
 
 def validate_username(username):
     """Checks username for validity."""
 
-    pattern = re.compile(r'^[\w.@+-]+\Z')
-
     if username.lower() == "me":
         raise ValidationError(
             message="Cannot use 'me' as username. "
         )
-    if not pattern.findall(username):
+    if not USERNAME_PATTERN.findall(username):
         raise ValidationError(
             "Username contains invalid characters."
         )